@@ -7,7 +7,7 @@ import zxcvbn
 import pyperclip
 import json
 from datetime import datetime
-import qrcode
+from qr_batch_generator import make_qr_image
 import os
 import hashlib
 import argon2
@@ -532,24 +532,12 @@ class PasswordManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             file_path = f"qr_code_{timestamp}.png"
         
-        # Map error correction levels
-        ecc_map = {
-            'L': qrcode.constants.ERROR_CORRECT_L,
-            'M': qrcode.constants.ERROR_CORRECT_M,
-            'Q': qrcode.constants.ERROR_CORRECT_Q,
-            'H': qrcode.constants.ERROR_CORRECT_H
-        }
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=ecc_map.get(error_correction, qrcode.constants.ERROR_CORRECT_L),
+        img = make_qr_image(
+            data,
             box_size=size,
             border=border,
+            error_correction=error_correction
         )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
         img.save(file_path)
         return file_path
     
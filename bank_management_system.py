@@ -200,7 +200,32 @@ import uuid
 from datetime import datetime
 import hashlib
 import getpass
-from typing import List, Dict, Optional
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from collections import deque
+from itertools import repeat
+from collections.abc import MutableMapping
+from typing import List, Dict, Optional, Callable, Iterator
+
+JOURNAL_FILE = "journal.log"
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_FSYNC_BATCH = 64  # journal records written per fsync
+SNAPSHOT_INTERVAL = 10000  # journal records before a snapshot compacts the journal
+BANK_DB_FILE = "bank.db"
+SCHEMA_JSON_IMPORTED = 1  # PRAGMA user_version once JSON data has been imported into SQLite
+BANK_BACKEND = "json"  # "json" (snapshot + journal) or "sqlite"
+ARCHIVE_DIR = "archive"  # per-account files holding the detail of every snapshotted transaction
+ARCHIVE_READ_BLOCK = 64 * 1024  # bytes read at a time when paging backwards through an archive
+HOT_MONTHS = 2  # calendar months of transactions kept in memory (current + previous)
+INTEREST_BATCH_SIZE = 10_000  # interest postings locked, applied and journaled together
+# benchmark_interest budget per million accounts; SQLite also writes every posting through two indexes
+INTEREST_TARGET_SECONDS = {"json": 5.0, "sqlite": 10.0}
 
 class Transaction:
     def __init__(self, transaction_type: str, amount: float, description: str = ""):
@@ -221,15 +246,64 @@ class Transaction:
 
     @staticmethod
     def from_dict(data: Dict) -> 'Transaction':
-        transaction = Transaction(
-            data["type"],
-            data["amount"],
-            data.get("description", "")
-        )
-        transaction.transaction_id = data["transaction_id"]
-        transaction.timestamp = data["timestamp"]
+        return Transaction.restore(data["type"], data["amount"], data.get("description", ""),
+                                   data["transaction_id"], data["timestamp"])
+
+    @staticmethod
+    def restore(transaction_type: str, amount: float, description: str,
+                transaction_id: str, timestamp: str) -> 'Transaction':
+        """Build a transaction with a known id and time, skipping uuid4() and the clock."""
+        transaction = Transaction.__new__(Transaction)
+        transaction.transaction_id = transaction_id
+        transaction.timestamp = timestamp
+        transaction.transaction_type = transaction_type
+        transaction.amount = amount
+        transaction.description = description
         return transaction
 
+class MonthlyStatement:
+    """Summary of one calendar month of an account, kept once its transactions are archived."""
+
+    def __init__(self, month: str, opening_balance: float, closing_balance: float,
+                 total_deposits: float = 0.0, total_withdrawals: float = 0.0, transaction_count: int = 0):
+        self.month = month  # 'YYYY-MM'
+        self.opening_balance = opening_balance
+        self.closing_balance = closing_balance
+        self.total_deposits = total_deposits
+        self.total_withdrawals = total_withdrawals
+        self.transaction_count = transaction_count
+
+    @staticmethod
+    def from_transactions(month: str, closing_balance: float,
+                          transactions: List[Transaction]) -> 'MonthlyStatement':
+        """Build a month's statement backwards from its closing balance."""
+        deposits = sum(t.amount for t in transactions if t.transaction_type == "deposit")
+        withdrawals = sum(t.amount for t in transactions if t.transaction_type == "withdrawal")
+        return MonthlyStatement(month, round(closing_balance - deposits + withdrawals, 2),
+                                round(closing_balance, 2), round(deposits, 2), round(withdrawals, 2),
+                                len(transactions))
+
+    def to_dict(self) -> Dict:
+        return {
+            "month": self.month,
+            "opening_balance": self.opening_balance,
+            "closing_balance": self.closing_balance,
+            "total_deposits": self.total_deposits,
+            "total_withdrawals": self.total_withdrawals,
+            "transaction_count": self.transaction_count
+        }
+
+    @staticmethod
+    def from_dict(data: Dict) -> 'MonthlyStatement':
+        return MonthlyStatement(
+            data["month"],
+            data["opening_balance"],
+            data["closing_balance"],
+            data.get("total_deposits", 0.0),
+            data.get("total_withdrawals", 0.0),
+            data.get("transaction_count", 0)
+        )
+
 class BankAccount:
     def __init__(self, account_holder: str, account_number: str, balance: float = 0.0, 
                  account_type: str = "savings", overdraft_limit: float = 0.0):
@@ -241,6 +315,23 @@ class BankAccount:
         self.transactions: List[Transaction] = []
         self.interest_rate = self._get_interest_rate()
         self.last_interest_calculation = datetime.now().isoformat()
+        # Called with (account, transaction) after every recorded transaction
+        self.observer: Optional[Callable[['BankAccount', Transaction], None]] = None
+        # Storage that serves the transaction history instead of the in-memory list
+        self.history_store = None
+        # Months rolled out of self.transactions, oldest first, and where their detail went
+        self.statements: List[MonthlyStatement] = []
+        self.archive: Optional['TransactionArchive'] = None
+        # The archive file holds this account's transactions up to archive_size bytes and
+        # the hot ones start at hot_offset; the first saved_transactions entries of
+        # self.transactions are already in it
+        self.archive_size = 0
+        self.hot_offset = 0
+        self.saved_transactions = 0
+        self.archive_offsets: Dict[str, int] = {}  # transaction id -> byte offset in the archive
+        # Guards balance changes; a bank swaps in its TransferEngine lock for this account
+        self.lock = threading.RLock()
+        self.transfer_engine: Optional['TransferEngine'] = None
 
     def _get_interest_rate(self) -> float:
         rates = {
@@ -250,14 +341,21 @@ class BankAccount:
         }
         return rates.get(self.account_type, 0.0)
 
+    def _record(self, transaction: Transaction):
+        self.transactions.append(transaction)
+        if self.observer:
+            self.observer(self, transaction)
+
     def deposit(self, amount: float, description: str = "") -> bool:
         if amount <= 0:
             print("Deposit amount must be positive.")
             return False
         
-        self.balance += amount
-        self.transactions.append(Transaction("deposit", amount, description))
-        print(f"Deposited {amount:.2f}. New balance: {self.balance:.2f}")
+        with self.lock:
+            self.balance += amount
+            self._record(Transaction("deposit", amount, description))
+            balance = self.balance
+        print(f"Deposited {amount:.2f}. New balance: {balance:.2f}")
         return True
 
     def withdraw(self, amount: float, description: str = "") -> bool:
@@ -265,14 +363,16 @@ class BankAccount:
             print("Withdrawal amount must be positive.")
             return False
         
-        available_balance = self.balance + self.overdraft_limit
-        if amount > available_balance:
-            print(f"Insufficient funds. Available: {available_balance:.2f}")
-            return False
-        
-        self.balance -= amount
-        self.transactions.append(Transaction("withdrawal", amount, description))
-        print(f"Withdrew {amount:.2f}. New balance: {self.balance:.2f}")
+        with self.lock:
+            available_balance = self.balance + self.overdraft_limit
+            if amount > available_balance:
+                print(f"Insufficient funds. Available: {available_balance:.2f}")
+                return False
+
+            self.balance -= amount
+            self._record(Transaction("withdrawal", amount, description))
+            balance = self.balance
+        print(f"Withdrew {amount:.2f}. New balance: {balance:.2f}")
         return True
 
     def transfer(self, amount: float, recipient: 'BankAccount', description: str = "") -> bool:
@@ -280,46 +380,140 @@ class BankAccount:
             print("Transfer amount must be positive.")
             return False
         
-        if not self.withdraw(amount, f"Transfer to {recipient.account_number}"):
-            return False
-        
-        if not recipient.deposit(amount, f"Transfer from {self.account_number}"):
-            # Refund if deposit fails
-            self.deposit(amount, "Refund for failed transfer")
-            return False
+        if self.transfer_engine is not None:
+            # Both legs under both accounts' locks, persisted as one entry
+            if not self.transfer_engine.transfer(self, recipient, amount, description):
+                print(f"Transfer declined. Available: {self.balance + self.overdraft_limit:.2f}")
+                return False
+        else:
+            if not self.withdraw(amount, f"Transfer to {recipient.account_number}"):
+                return False
+
+            if not recipient.deposit(amount, f"Transfer from {self.account_number}"):
+                # Refund if deposit fails
+                self.deposit(amount, "Refund for failed transfer")
+                return False
         
         print(f"Transferred {amount:.2f} to account {recipient.account_number}")
         return True
 
     def calculate_interest(self) -> float:
-        now = datetime.now()
-        last_calc = datetime.fromisoformat(self.last_interest_calculation)
-        days = (now - last_calc).days
-        
-        if days <= 0:
-            return 0.0
-        
-        interest = self.balance * self.interest_rate * (days / 365)
-        if interest > 0:
-            self.deposit(interest, "Interest payment")
-            self.last_interest_calculation = now.isoformat()
-        
+        with self.lock:
+            now = datetime.now()
+            last_calc = datetime.fromisoformat(self.last_interest_calculation)
+            days = (now - last_calc).days
+
+            if days <= 0:
+                return 0.0
+
+            interest = self.balance * self.interest_rate * (days / 365)
+            if interest > 0:
+                # Set before depositing so the journal record carries the new date
+                self.last_interest_calculation = now.isoformat()
+                self.deposit(interest, "Interest payment")
+
         return interest
 
-    def get_transaction_history(self, limit: int = 10) -> List[Transaction]:
-        return self.transactions[-limit:]
+    def get_transaction_history(self, limit: int = 10,
+                                before: Optional[Transaction] = None) -> List[Transaction]:
+        """The latest transactions, oldest first; pass before=page[0] to fetch the previous page."""
+        if self.history_store is not None:
+            return self.history_store.fetch_history(self.account_number, limit, before)
+        page = self._page(self.transactions, limit, before)
+        if self.archive is None or (page is not None and len(page) >= limit):
+            return page or []
+
+        # Reaching past the hot transactions: read backwards through the archive from
+        # the oldest transaction shown so far
+        if page is None:
+            end = self.archive_offsets.get(before.transaction_id)
+            if end is None:
+                return []
+            page = []
+        else:
+            end = self.hot_offset
+        older = self.archive.read_before(self.account_number, end, limit - len(page))
+        self.archive_offsets.update((t.transaction_id, offset) for offset, t in older)
+        return [t for _, t in older] + page
 
-    def to_dict(self) -> Dict:
-        return {
+    @staticmethod
+    def _page(transactions: List[Transaction], limit: int,
+              before: Optional[Transaction]) -> Optional[List[Transaction]]:
+        """The limit transactions before `before`, or None if it isn't in the list."""
+        if before is not None:
+            for index in range(len(transactions) - 1, -1, -1):
+                if transactions[index].transaction_id == before.transaction_id:
+                    return transactions[max(index - limit, 0):index]
+            return None
+        return transactions[-limit:]
+
+    def load_history(self):
+        """Read the hot transactions back from the archive, ahead of any not saved yet."""
+        saved = self.archive.read(self.account_number, self.hot_offset, self.archive_size)
+        self.transactions = [t for _, t in saved] + self.transactions
+        self.saved_transactions = len(saved)
+        self.archive_offsets.update((t.transaction_id, offset) for offset, t in saved)
+
+    def save_history(self, upto: Optional[int] = None):
+        """Append transactions not in the archive yet (up to index upto) to it."""
+        unsaved = self.transactions[self.saved_transactions:upto]
+        if not unsaved:
+            return
+        offsets, self.archive_size = self.archive.append(self.account_number, self.archive_size, unsaved)
+        self.archive_offsets.update((t.transaction_id, offset) for t, offset in zip(unsaved, offsets))
+        self.saved_transactions += len(unsaved)
+
+    def roll_up(self, cutoff_month: str) -> List[Transaction]:
+        """
+        Replace transactions from months before cutoff_month ('YYYY-MM') with
+        monthly statements; their detail stays in the archive. Returns them.
+        """
+        split = 0
+        while split < len(self.transactions) and self.transactions[split].timestamp[:7] < cutoff_month:
+            split += 1
+        if not split:
+            return []
+        old, hot = self.transactions[:split], self.transactions[split:]
+        if self.archive is not None:
+            self.save_history(split)
+
+        # Walk back from the current balance to each archived month's closing balance
+        closing = MonthlyStatement.from_transactions("", self.balance, hot).opening_balance
+        months: Dict[str, List[Transaction]] = {}
+        for transaction in old:
+            months.setdefault(transaction.timestamp[:7], []).append(transaction)
+        statements = []
+        for month in sorted(months, reverse=True):
+            statement = MonthlyStatement.from_transactions(month, closing, months[month])
+            statements.append(statement)
+            closing = statement.opening_balance
+
+        self.statements.extend(reversed(statements))
+        self.transactions = hot
+        self.saved_transactions = max(self.saved_transactions - split, 0)
+        self.hot_offset = self.archive_offsets[hot[0].transaction_id] if self.saved_transactions \
+            else self.archive_size
+        return old
+
+    def to_dict(self, include_transactions: bool = True) -> Dict:
+        data = {
             "account_holder": self.account_holder,
             "account_number": self.account_number,
             "balance": self.balance,
             "account_type": self.account_type,
             "overdraft_limit": self.overdraft_limit,
-            "transactions": [t.to_dict() for t in self.transactions],
             "interest_rate": self.interest_rate,
             "last_interest_calculation": self.last_interest_calculation
         }
+        if include_transactions:
+            # Saved transactions are read back from the archive; only newer ones are inline
+            data["transactions"] = [t.to_dict() for t in self.transactions[self.saved_transactions:]]
+            data["statements"] = [s.to_dict() for s in self.statements]
+            data["archive_size"] = self.archive_size
+            data["hot_offset"] = self.hot_offset
+            # Lets the month-end roll-up skip accounts without old transactions unread
+            data["hot_since"] = self.transactions[0].timestamp[:7] if self.transactions else None
+        return data
 
     @staticmethod
     def from_dict(data: Dict) -> 'BankAccount':
@@ -331,6 +525,9 @@ class BankAccount:
             data.get("overdraft_limit", 0.0)
         )
         account.transactions = [Transaction.from_dict(t) for t in data.get("transactions", [])]
+        account.statements = [MonthlyStatement.from_dict(s) for s in data.get("statements", [])]
+        account.archive_size = data.get("archive_size", 0)
+        account.hot_offset = data.get("hot_offset", 0)
         account.interest_rate = data.get("interest_rate", 0.0)
         account.last_interest_calculation = data.get("last_interest_calculation", datetime.now().isoformat())
         return account
@@ -367,24 +564,416 @@ class User:
         user.accounts = data.get("accounts", [])
         return user
 
+class TransactionJournal:
+    """Append-only write-ahead log of bank changes, one JSON record per line."""
+
+    def __init__(self, path: str, fsync_batch: int = JOURNAL_FSYNC_BATCH):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.sequence = 0  # sequence number of the last record written
+        self.records_since_snapshot = 0
+        self._unsynced = 0
+        # Re-entrant so a writer can hold it across a change and that change's append
+        self._lock = threading.RLock()
+        self._discard_torn_tail()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _discard_torn_tail(self):
+        """Cut off a partial last record left by a crash, so new records start on a fresh line."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            f.seek(0)
+            f.truncate(f.read().rfind(b"\n") + 1)
+
+    def read(self, after_sequence: int = 0) -> Iterator[Dict]:
+        """Yield records newer than after_sequence; a torn final line from a crash is ignored."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self.sequence = max(self.sequence, record["seq"])
+                if record["seq"] > after_sequence:
+                    self.records_since_snapshot += 1
+                    yield record
+
+    def append(self, record: Dict, weight: int = 1):
+        """Append a record; weight is how many changes it carries (for snapshot pacing)."""
+        with self._lock:
+            self.sequence += 1
+            record["seq"] = self.sequence
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.records_since_snapshot += weight
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch:
+                self._sync()
+
+    def holding(self) -> threading.RLock:
+        """The lock appends and compaction take; hold it to keep a snapshot from running."""
+        return self._lock
+
+    def flush(self):
+        """Make every appended record durable."""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def truncate(self):
+        """Drop all records (they are covered by a snapshot); sequence numbers keep counting."""
+        with self._lock:
+            self._truncate()
+
+    def _truncate(self):
+        self._sync()
+        self._file.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.records_since_snapshot = 0
+
+    def compact(self, write_snapshot: Callable[[int], None]):
+        """
+        Call write_snapshot(sequence) and then drop the records it covers. Appends
+        wait until the journal is truncated, so no record can land in between.
+        """
+        with self._lock:
+            self._sync()
+            write_snapshot(self.sequence)
+            self._truncate()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+class TransactionArchive:
+    """
+    Full transaction detail, one append-only JSON-lines file per account. The
+    snapshot records how many bytes of each file it covers and where the hot
+    transactions start, so readers seek straight to the lines they need.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, account_number: str) -> str:
+        return os.path.join(self.directory, f"{account_number}.jsonl")
+
+    def append(self, account_number: str, size: int, transactions: List[Transaction]):
+        """
+        Write transactions after the first size bytes and fsync, so the snapshot that
+        relies on them can follow safely. Anything past size was written before a crash
+        and never reached a snapshot, so it is cut off first. Returns (offsets, new size).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        lines = [(json.dumps(t.to_dict(), separators=(",", ":")) + "\n").encode("utf-8") for t in transactions]
+        offsets, position = [], size
+        for line in lines:
+            offsets.append(position)
+            position += len(line)
+        with open(self._path(account_number), "ab") as f:
+            f.truncate(size)
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        return offsets, position
+
+    def read(self, account_number: str, start: int = 0, end: int = 0) -> List[tuple]:
+        """(offset, transaction) pairs for the lines between byte offsets start and end, oldest first."""
+        if end <= start:
+            return []
+        with open(self._path(account_number), "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return self._parse(data, start)
+
+    def read_before(self, account_number: str, end: int, limit: int) -> List[tuple]:
+        """The last limit (offset, transaction) pairs before byte offset end, read backwards in blocks."""
+        if end <= 0 or limit <= 0:
+            return []
+        data, start = b"", end
+        with open(self._path(account_number), "rb") as f:
+            # One newline more than needed, since the first line read may be cut off
+            while start > 0 and data.count(b"\n") <= limit:
+                step = min(ARCHIVE_READ_BLOCK, start)
+                start -= step
+                f.seek(start)
+                data = f.read(step) + data
+        if start > 0:
+            cut = data.index(b"\n") + 1
+            data, start = data[cut:], start + cut
+        return self._parse(data, start)[-limit:]
+
+    @staticmethod
+    def _parse(data: bytes, start: int) -> List[tuple]:
+        pairs, offset = [], start
+        for line in data.splitlines(keepends=True):
+            pairs.append((offset, Transaction.from_dict(json.loads(line))))
+            offset += len(line)
+        return pairs
+
+class LazyAccounts(MutableMapping):
+    """
+    Account mapping that keeps snapshot entries as raw dicts and only builds the
+    BankAccount (and its Transaction objects) the first time an account is used.
+    """
+
+    def __init__(self, loader: Callable[[Dict], BankAccount]):
+        self._loader = loader
+        self._raw: Dict[str, Dict] = {}
+        self._loaded: Dict[str, BankAccount] = {}
+        self._lock = threading.Lock()
+
+    def add_raw(self, account_number: str, data: Dict):
+        self._loaded.pop(account_number, None)
+        self._raw[account_number] = data
+
+    def __getitem__(self, account_number: str) -> BankAccount:
+        account = self._loaded.get(account_number)
+        if account is None:
+            # Locked so two threads can't build two copies of the same account
+            with self._lock:
+                account = self._loaded.get(account_number)
+                if account is None:
+                    account = self._loader(self._raw.pop(account_number))
+                    self._loaded[account_number] = account
+        return account
+
+    def __setitem__(self, account_number: str, account: BankAccount):
+        self._raw.pop(account_number, None)
+        self._loaded[account_number] = account
+
+    def __delitem__(self, account_number: str):
+        if self._loaded.pop(account_number, None) is None:
+            del self._raw[account_number]
+
+    def __contains__(self, account_number) -> bool:
+        return account_number in self._loaded or account_number in self._raw
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._loaded)
+        yield from list(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._loaded) + len(self._raw)
+
+    def loaded(self) -> List[BankAccount]:
+        return list(self._loaded.values())
+
+    def update_raw(self, update: Callable[[Dict], Dict]):
+        """Replace the stored form of every account not loaded yet with update(data)."""
+        for account_number in list(self._raw):
+            # Locked per account so a concurrent load sees either the old or the new form
+            with self._lock:
+                data = self._raw.get(account_number)
+                if data is not None:
+                    self._raw[account_number] = update(data)
+
+    def all(self) -> List[BankAccount]:
+        """Every account, building the ones not used yet (faster than walking values())."""
+        for account_number in list(self._raw):
+            self[account_number]
+        return list(self._loaded.values())
+
+    def to_dicts(self) -> List[Dict]:
+        """Snapshot form of every account; untouched ones are written back as loaded."""
+        # Locked so an account being loaded right now is counted exactly once
+        with self._lock:
+            loaded, raw = list(self._loaded.values()), list(self._raw.values())
+        return [account.to_dict() for account in loaded] + raw
+
 class Bank:
-    def __init__(self, data_dir: str = "bank_data"):
+    def __init__(self, data_dir: str = "bank_data", snapshot_interval: int = SNAPSHOT_INTERVAL):
         self.data_dir = data_dir
+        self.snapshot_interval = snapshot_interval
         os.makedirs(data_dir, exist_ok=True)
         
-        self.accounts: Dict[str, BankAccount] = {}
+        self.archive = TransactionArchive(os.path.join(data_dir, ARCHIVE_DIR))
+        self.accounts = LazyAccounts(self._load_account)
         self.users: Dict[str, User] = {}
         self.current_user: Optional[User] = None
+        # Called with (account, transaction) once a transaction has been persisted
+        self.listeners: List[Callable[[BankAccount, Transaction], None]] = []
         
+        # Created before loading so every account gets its lock as it is attached
+        self.transfer_engine = TransferEngine(self)
+        # One snapshot at a time, whichever thread's commit crosses snapshot_interval
+        self.compaction_lock = threading.RLock()
+        self.rolled_up_month = ""  # cutoff month of the last roll-up over every account
         self._load_data()
 
+    def _load_account(self, data: Dict) -> BankAccount:
+        """Build an account from its stored form and hook it up to this bank."""
+        return self._attach_account(self._read_account(data))
+
+    def _read_account(self, data: Dict) -> BankAccount:
+        """Build an account from its stored form, reading its hot transactions from the archive."""
+        account = BankAccount.from_dict(data)
+        account.archive = self.archive
+        if "archive_size" not in data:
+            # Older snapshots kept every hot transaction inline; any archive holds cold ones only
+            path = self.archive._path(account.account_number)
+            account.archive_size = account.hot_offset = os.path.getsize(path) if os.path.exists(path) else 0
+        account.load_history()
+        return account
+
+    def _attach_account(self, account: BankAccount) -> BankAccount:
+        account.observer = self._on_transaction
+        account.archive = self.archive
+        # Deposits, withdrawals, interest and transfers all serialize on this one lock
+        account.lock = self.transfer_engine.lock_for(account.account_number)
+        account.transfer_engine = self.transfer_engine
+        return account
+
     def _load_data(self):
+        """Load the last snapshot, then replay the journal written since."""
+        self._load_snapshot()
+        snapshot_file = os.path.join(self.data_dir, SNAPSHOT_FILE)
+        snapshot_sequence = 0
+        if os.path.exists(snapshot_file):
+            with open(snapshot_file, "r") as f:
+                snapshot = json.load(f)
+            snapshot_sequence = snapshot["sequence"]
+            self.rolled_up_month = snapshot.get("rolled_up_month", "")
+
+        self.journal = TransactionJournal(os.path.join(self.data_dir, JOURNAL_FILE))
+        self.journal.sequence = snapshot_sequence
+        self._replay_journal(self.journal.read(snapshot_sequence))
+
+    def _replay_journal(self, records: Iterator[Dict]):
+        # A crash between writing a snapshot and truncating the journal can leave
+        # records that the snapshot already holds, so replay must be idempotent.
+        replayed_ids: Dict[str, set] = {}
+        for record in records:
+            op = record["op"]
+            if op == "user":
+                self.users[record["user"]["username"]] = User.from_dict(record["user"])
+            elif op == "account":
+                data = record["account"]
+                account = self.accounts.get(data["account_number"])
+                if account is None:
+                    self.accounts[data["account_number"]] = self._load_account(data)
+                else:
+                    account.balance = data["balance"]
+                    account.overdraft_limit = data.get("overdraft_limit", 0.0)
+                    account.interest_rate = data.get("interest_rate", account.interest_rate)
+                    account.last_interest_calculation = data.get("last_interest_calculation",
+                                                                 account.last_interest_calculation)
+            elif op == "txn":
+                self._replay_leg(record, replayed_ids)
+            elif op == "transfer":
+                for leg in record["legs"]:
+                    self._replay_leg(leg, replayed_ids)
+            elif op == "interest":
+                for account_number, balance, transaction_id, amount in zip(
+                        record["accounts"], record["balances"], record["transaction_ids"], record["amounts"]):
+                    self._replay_leg({
+                        "account": account_number,
+                        "balance": balance,
+                        "last_interest_calculation": record["timestamp"],
+                        "transaction": {"transaction_id": transaction_id, "timestamp": record["timestamp"],
+                                        "type": "deposit", "amount": amount, "description": "Interest payment"}
+                    }, replayed_ids)
+
+    def _replay_leg(self, leg: Dict, replayed_ids: Dict[str, set]):
+        account = self.accounts[leg["account"]]
+        account.balance = leg["balance"]
+        account.last_interest_calculation = leg["last_interest_calculation"]
+        if leg["account"] not in replayed_ids:
+            replayed_ids[leg["account"]] = {t.transaction_id for t in account.transactions}
+        transaction = Transaction.from_dict(leg["transaction"])
+        # Months already rolled into statements were archived with this transaction
+        if account.statements and transaction.timestamp[:7] <= account.statements[-1].month:
+            return
+        if transaction.transaction_id not in replayed_ids[leg["account"]]:
+            account.transactions.append(transaction)
+
+    @staticmethod
+    def _journal_leg(account: BankAccount, transaction: Transaction) -> Dict:
+        return {
+            "account": account.account_number,
+            "balance": account.balance,
+            "last_interest_calculation": account.last_interest_calculation,
+            "transaction": transaction.to_dict()
+        }
+
+    def _publish(self, account: BankAccount, transaction: Transaction):
+        for listener in self.listeners:
+            listener(account, transaction)
+
+    def _on_transaction(self, account: BankAccount, transaction: Transaction):
+        self.journal.append({"op": "txn", **self._journal_leg(account, transaction)})
+        self._publish(account, transaction)
+
+    def _transfer_barrier(self):
+        """
+        Held while a transfer changes both balances and journals them. Compaction
+        holds the same lock, so a snapshot never sees just one leg of a transfer.
+        """
+        return self.journal.holding()
+
+    def _record_transfer(self, source: BankAccount, outgoing: Transaction,
+                         recipient: BankAccount, incoming: Transaction):
+        """Persist both legs of a transfer as a single journal entry."""
+        self.journal.append({
+            "op": "transfer",
+            "legs": [self._journal_leg(source, outgoing), self._journal_leg(recipient, incoming)]
+        })
+        self._publish(source, outgoing)
+        self._publish(recipient, incoming)
+
+    def _record_interest(self, accounts: List[BankAccount], amounts: List[float],
+                         transaction_ids: List[str], timestamp: str):
+        """Persist a batch of interest postings as one columnar journal entry."""
+        transactions = [Transaction.restore("deposit", amount, "Interest payment", transaction_id, timestamp)
+                        for amount, transaction_id in zip(amounts, transaction_ids)]
+        for account, transaction in zip(accounts, transactions):
+            account.transactions.append(transaction)
+        self.journal.append({
+            "op": "interest",
+            "timestamp": timestamp,
+            "accounts": [account.account_number for account in accounts],
+            "balances": [account.balance for account in accounts],
+            "transaction_ids": transaction_ids,
+            "amounts": amounts
+        }, weight=len(accounts))
+        if self.listeners:
+            for account, transaction in zip(accounts, transactions):
+                self._publish(account, transaction)
+
+    def _persist_account(self, account: BankAccount):
+        self.journal.append({"op": "account", "account": account.to_dict(include_transactions=False)})
+
+    def _persist_user(self, user: User):
+        self.journal.append({"op": "user", "user": user.to_dict()})
+
+    def commit(self, compact: bool = True):
+        """Make journaled changes durable; compact into a snapshot every snapshot_interval records."""
+        self.journal.flush()
+        if compact and self.journal.records_since_snapshot >= self.snapshot_interval:
+            with self.compaction_lock:
+                # Another thread may have compacted while this one waited
+                if self.journal.records_since_snapshot >= self.snapshot_interval:
+                    self._save_data()
+
+    def close(self):
+        self.journal.close()
+
+    def _load_snapshot(self):
         # Load accounts
         accounts_file = os.path.join(self.data_dir, "accounts.json")
         if os.path.exists(accounts_file):
             with open(accounts_file, "r") as f:
-                accounts_data = json.load(f)
-                self.accounts = {acc["account_number"]: BankAccount.from_dict(acc) for acc in accounts_data}
+                for acc in json.load(f):
+                    self.accounts.add_raw(acc["account_number"], acc)
 
         # Load users
         users_file = os.path.join(self.data_dir, "users.json")
@@ -393,16 +982,82 @@ class Bank:
                 users_data = json.load(f)
                 self.users = {user["username"]: User.from_dict(user) for user in users_data}
 
-    def _save_data(self):
+    def _save_data(self, now: Optional[datetime] = None, roll_up_all: bool = False):
+        """
+        Write a full snapshot and compact the journal it covers. The first snapshot
+        after a month turns over rolls up every account, loaded or not.
+        """
+        cutoff_month = self._cutoff_month(now or datetime.now())
+        with self.compaction_lock:
+            # Roll-up takes account locks, so it must finish before the journal blocks appends
+            self._roll_up(self.accounts.loaded(), cutoff_month)
+            if roll_up_all or cutoff_month > self.rolled_up_month:
+                self.accounts.update_raw(lambda data: self._roll_up_raw(data, cutoff_month))
+                self.rolled_up_month = max(self.rolled_up_month, cutoff_month)
+            self.journal.compact(self._write_snapshot)
+
+    def _write_snapshot(self, sequence: int):
+        # A deposit or withdrawal blocked on the journal may already have changed its
+        # account; the snapshot can include that change, and replaying its record again
+        # is harmless. Transfers change balances only under the journal lock.
+        for account in self.accounts.loaded():
+            account.save_history()
+
         # Save accounts
         accounts_file = os.path.join(self.data_dir, "accounts.json")
-        with open(accounts_file, "w") as f:
-            json.dump([acc.to_dict() for acc in self.accounts.values()], f, indent=2)
+        self._write_atomic(accounts_file, self.accounts.to_dicts())
 
         # Save users
         users_file = os.path.join(self.data_dir, "users.json")
-        with open(users_file, "w") as f:
-            json.dump([user.to_dict() for user in self.users.values()], f, indent=2)
+        self._write_atomic(users_file, [user.to_dict() for user in list(self.users.values())])
+
+        self._write_atomic(os.path.join(self.data_dir, SNAPSHOT_FILE),
+                           {"sequence": sequence, "rolled_up_month": self.rolled_up_month})
+
+    @staticmethod
+    def _cutoff_month(now: datetime) -> str:
+        """The oldest month ('YYYY-MM') whose transactions stay hot."""
+        month_index = now.year * 12 + now.month - HOT_MONTHS
+        return f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+    def _roll_up(self, accounts: List[BankAccount], cutoff_month: str):
+        """Move transactions from before cutoff_month out of memory, keeping their monthly statements."""
+        for account in accounts:
+            with self.transfer_engine.lock_for(account.account_number):
+                account.roll_up(cutoff_month)
+
+    def _roll_up_raw(self, data: Dict, cutoff_month: str) -> Dict:
+        """Roll up an account that is not loaded, returning its new stored form."""
+        if "hot_since" in data and (data["hot_since"] is None or data["hot_since"] >= cutoff_month):
+            return data
+        account = self._read_account(data)
+        account.roll_up(cutoff_month)
+        account.save_history()
+        return account.to_dict()
+
+    def roll_up_statements(self, now: Optional[datetime] = None):
+        """Month-end job: roll up every account, including ones not loaded yet, and snapshot."""
+        self._save_data(now, roll_up_all=True)
+
+    def get_statements(self, account_number: str) -> List[MonthlyStatement]:
+        account = self.get_account(account_number)
+        return list(account.statements) if account else []
+
+    @staticmethod
+    def _write_atomic(path: str, data):
+        # A unique temp file, so two writers can never interleave into the same one
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".",
+                                         dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "w") as f:
+                # dumps() uses the C encoder; dump() streams through the pure-Python one
+                f.write(json.dumps(data, separators=(",", ":")))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
 
     def generate_account_number(self) -> str:
         while True:
@@ -413,13 +1068,15 @@ class Bank:
     def create_account(self, account_holder: str, account_type: str = "savings", 
                       initial_deposit: float = 0.0) -> Optional[BankAccount]:
         account_number = self.generate_account_number()
-        new_account = BankAccount(account_holder, account_number, initial_deposit, account_type)
+        new_account = self._attach_account(BankAccount(account_holder, account_number, initial_deposit, account_type))
         
         self.accounts[account_number] = new_account
+        self._persist_account(new_account)
         if self.current_user:
             self.current_user.accounts.append(account_number)
+            self._persist_user(self.current_user)
         
-        self._save_data()
+        self.commit()
         print(f"Account created successfully. Account number: {account_number}")
         return new_account
 
@@ -438,17 +1095,102 @@ class Bank:
         
         new_user = User(username, User._hash_password(password), role)
         self.users[username] = new_user
-        self._save_data()
+        self._persist_user(new_user)
+        self.commit()
         print("Registration successful. Please login.")
         return True
 
     def get_account(self, account_number: str) -> Optional[BankAccount]:
         return self.accounts.get(account_number)
 
-    def calculate_all_interest(self):
-        for account in self.accounts.values():
-            account.calculate_interest()
-        self._save_data()
+    def transfer(self, from_account_number: str, to_account_number: str,
+                 amount: float, description: str = "") -> bool:
+        """Thread-safe transfer between two accounts of this bank."""
+        source = self.get_account(from_account_number)
+        recipient = self.get_account(to_account_number)
+        if source is None or recipient is None:
+            return False
+        return self.transfer_engine.transfer(source, recipient, amount, description)
+
+    def calculate_all_interest(self, now: Optional[datetime] = None) -> int:
+        """
+        End-of-day interest for every account in one vectorized pass.
+
+        Same rule as BankAccount.calculate_interest (whole days since the last
+        calculation, positive interest only), but computed in integer cents over
+        arrays and posted without printing in batches of INTEREST_BATCH_SIZE:
+        each batch is applied and persisted while its accounts' locks are held, with
+        ids derived from one run id and a single shared timestamp. An account whose
+        balance or last calculation changed before its lock was taken (another run,
+        calculate_interest, a deposit) is recomputed under the lock, so no period is
+        credited twice. Returns the number of accounts credited.
+        """
+        now = now or datetime.now()
+        accounts = self.accounts.all()
+        if not accounts:
+            return 0
+
+        count = len(accounts)
+        balances = [a.balance for a in accounts]
+        last_calculations = [a.last_interest_calculation for a in accounts]
+        balance_cents = np.rint(np.array(balances, np.float64) * 100)
+        rates = np.fromiter((a.interest_rate for a in accounts), np.float64, count)
+        last_calculation = np.array(last_calculations, dtype="datetime64[us]")
+        days = (np.datetime64(now, "us") - last_calculation) // np.timedelta64(1, "D")
+
+        interest_cents = np.rint(balance_cents * rates * np.maximum(days, 0) / 365).astype(np.int64)
+        credited = np.flatnonzero((days > 0) & (interest_cents > 0))
+
+        timestamp = now.isoformat()
+        run_id = uuid.uuid4().hex
+        held: List[tuple] = []  # (account, amount) whose lock this thread holds
+        posted = 0
+        for index, amount in zip(credited.tolist(), (interest_cents[credited] / 100).tolist()):
+            account = accounts[index]
+            # Never wait for a lock while holding others (a transfer could be holding
+            # this one and waiting for ours): post the held batch first
+            if not account.lock.acquire(blocking=False):
+                posted += self._post_interest(held, run_id, posted, timestamp)
+                account.lock.acquire()
+            if account.balance != balances[index] or \
+                    account.last_interest_calculation != last_calculations[index]:
+                amount = self._interest_due(account, now)
+                if amount <= 0:
+                    account.lock.release()
+                    continue
+            held.append((account, amount))
+            if len(held) >= INTEREST_BATCH_SIZE:
+                posted += self._post_interest(held, run_id, posted, timestamp)
+        posted += self._post_interest(held, run_id, posted, timestamp)
+
+        # Durable now; rewriting every account into a snapshot is left to a later commit
+        self.commit(compact=False)
+        return posted
+
+    @staticmethod
+    def _interest_due(account: BankAccount, now: datetime) -> float:
+        """calculate_all_interest's rule for a single account; call with its lock held."""
+        days = (now - datetime.fromisoformat(account.last_interest_calculation)).days
+        if days <= 0:
+            return 0.0
+        return round(round(account.balance * 100) * account.interest_rate * days / 365) / 100
+
+    def _post_interest(self, held: List[tuple], run_id: str, first: int, timestamp: str) -> int:
+        """Credit and persist (account, amount) pairs whose locks are held, then release them."""
+        count = len(held)
+        if not count:
+            return 0
+        try:
+            for account, amount in held:
+                account.balance += amount
+                account.last_interest_calculation = timestamp
+            self._record_interest([account for account, _ in held], [amount for _, amount in held],
+                                  [f"{run_id}-{number}" for number in range(first, first + count)], timestamp)
+        finally:
+            for account, _ in held:
+                account.lock.release()
+            held.clear()
+        return count
 
     def get_user_accounts(self) -> List[BankAccount]:
         if not self.current_user:
@@ -456,6 +1198,509 @@ class Bank:
         return [self.accounts[acc_num] for acc_num in self.current_user.accounts 
                 if acc_num in self.accounts]
 
+class TransferEngine:
+    """
+    Transfers that are safe to run from many threads. Both accounts are locked in
+    account-number order (so two opposite transfers can't deadlock), both legs are
+    applied under the locks and the bank records them as one entry. The same
+    per-account locks guard deposits, withdrawals and interest postings; they are
+    re-entrant because calculate_interest deposits while holding its lock.
+    """
+
+    def __init__(self, bank: 'Bank'):
+        self.bank = bank
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+
+    def lock_for(self, account_number: str) -> threading.RLock:
+        lock = self._locks.get(account_number)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(account_number, threading.RLock())
+        return lock
+
+    def transfer(self, source: BankAccount, recipient: BankAccount,
+                 amount: float, description: str = "") -> bool:
+        if amount <= 0 or source.account_number == recipient.account_number:
+            return False
+
+        first, second = sorted((source.account_number, recipient.account_number))
+        with self.lock_for(first), self.lock_for(second):
+            if amount > source.balance + source.overdraft_limit:
+                return False
+            note = f": {description}" if description else ""
+            outgoing = Transaction("withdrawal", amount, f"Transfer to {recipient.account_number}{note}")
+            incoming = Transaction("deposit", amount, f"Transfer from {source.account_number}{note}")
+            with self.bank._transfer_barrier():
+                source.balance -= amount
+                recipient.balance += amount
+                source.transactions.append(outgoing)
+                recipient.transactions.append(incoming)
+                self.bank._record_transfer(source, outgoing, recipient, incoming)
+        return True
+
+class VelocityRule:
+    """
+    Alert when an account's matching transactions within `window` seconds reach
+    max_count transactions or max_amount in total (either limit may be None).
+    """
+
+    def __init__(self, name: str, transaction_types: tuple = ("withdrawal",), window: float = 300,
+                 max_count: Optional[int] = None, max_amount: Optional[float] = None,
+                 description_prefix: str = ""):
+        if max_count is None and max_amount is None:
+            raise ValueError(f"Rule '{name}' needs max_count or max_amount")
+        if window <= 0:
+            raise ValueError(f"Rule '{name}' needs a positive window, got {window}")
+        if max_count is not None and max_count <= 0:
+            raise ValueError(f"Rule '{name}' needs a positive max_count, got {max_count}")
+        if max_amount is not None and max_amount <= 0:
+            raise ValueError(f"Rule '{name}' needs a positive max_amount, got {max_amount}")
+        self.name = name
+        self.transaction_types = frozenset(transaction_types)
+        self.window = window
+        self.max_count = max_count
+        self.max_amount = max_amount
+        self.description_prefix = description_prefix
+
+    def matches(self, transaction: Transaction) -> bool:
+        return (transaction.transaction_type in self.transaction_types
+                and transaction.description.startswith(self.description_prefix))
+
+    def exceeded(self, count: int, total: float) -> bool:
+        return ((self.max_count is not None and count >= self.max_count)
+                or (self.max_amount is not None and total >= self.max_amount))
+
+DEFAULT_VELOCITY_RULES = [
+    VelocityRule("rapid-withdrawals", ("withdrawal",), window=300, max_count=5),
+    VelocityRule("rapid-transfers", ("withdrawal",), window=600, max_count=3, description_prefix="Transfer to"),
+    VelocityRule("large-outflow", ("withdrawal",), window=3600, max_amount=10000),
+]
+
+class FraudAlert:
+    def __init__(self, rule: VelocityRule, account_number: str, transaction: Transaction,
+                 count: int, total: float):
+        self.rule_name = rule.name
+        self.account_number = account_number
+        self.transaction_id = transaction.transaction_id
+        self.timestamp = transaction.timestamp
+        self.count = count
+        self.total = total
+        self.window = rule.window
+
+    def __str__(self) -> str:
+        return (f"[{self.timestamp}] {self.rule_name}: account {self.account_number} made "
+                f"{self.count} transactions totalling {self.total:.2f} within {self.window:.0f}s")
+
+class VelocityDetector:
+    """
+    Streaming sliding-window counters per (account, rule). Each window is a deque
+    of (time, amount) with a running sum, so an event costs O(1) amortized: push
+    it, pop what fell out of the window, compare. History is never rescanned.
+    A rule fires once when its limit is reached and re-arms after the window
+    drops back under the limit.
+    """
+
+    def __init__(self, rules: Optional[List[VelocityRule]] = None,
+                 on_alert: Optional[Callable[[FraudAlert], None]] = None, max_alerts: int = 1000):
+        self.rules = list(rules if rules is not None else DEFAULT_VELOCITY_RULES)
+        self.on_alert = on_alert
+        self.alerts: deque = deque(maxlen=max_alerts)  # most recent alerts
+        # (account_number, rule index) -> [events deque, running total, alerting]
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self._epoch = datetime(1970, 1, 1)
+
+    def observe(self, account: BankAccount, transaction: Transaction) -> List[FraudAlert]:
+        """Feed one transaction (usable as a Bank listener); returns the alerts it raised."""
+        rules = [(index, rule) for index, rule in enumerate(self.rules) if rule.matches(transaction)]
+        if not rules:
+            return []
+        now = (datetime.fromisoformat(transaction.timestamp) - self._epoch).total_seconds()
+        amount = transaction.amount
+        raised = []
+        with self._lock:
+            for index, rule in rules:
+                key = (account.account_number, index)
+                state = self._windows.get(key)
+                if state is None:
+                    state = self._windows[key] = [deque(), 0.0, False]
+                events = state[0]
+                events.append((now, amount))
+                state[1] += amount
+                horizon = now - rule.window
+                while events[0][0] <= horizon:
+                    state[1] -= events.popleft()[1]
+
+                if rule.exceeded(len(events), state[1]):
+                    if not state[2]:
+                        state[2] = True
+                        raised.append(FraudAlert(rule, account.account_number, transaction,
+                                                 len(events), state[1]))
+                else:
+                    state[2] = False
+            self.alerts.extend(raised)
+        for alert in raised:
+            if self.on_alert:
+                self.on_alert(alert)
+        return raised
+
+    def prune(self, now: Optional[datetime] = None):
+        """Forget windows with nothing left inside them (for long-running processes)."""
+        now_seconds = ((now or datetime.now()) - self._epoch).total_seconds()
+        with self._lock:
+            for key in list(self._windows):
+                events = self._windows[key][0]
+                if events[-1][0] <= now_seconds - self.rules[key[1]].window:
+                    del self._windows[key]
+
+def benchmark_transfers(num_accounts: int = 1000, num_threads: int = 8,
+                        transfers_per_thread: int = 20000, backend: str = "json",
+                        snapshot_interval: int = SNAPSHOT_INTERVAL):
+    """
+    Hammer the transfer engine from several threads and check that money is conserved.
+    Workers commit as they go, so snapshots compact the journal mid-run.
+    """
+    data_dir = tempfile.mkdtemp(prefix="bank_bench_")
+    bank = SQLiteBank(data_dir) if backend == "sqlite" else Bank(data_dir, snapshot_interval)
+    for _ in range(num_accounts):
+        account = bank._attach_account(BankAccount("bench", bank.generate_account_number(), 1000.0))
+        bank.accounts[account.account_number] = account
+        bank._persist_account(account)
+    bank.commit()
+    account_numbers = list(bank.accounts)
+    total_before = sum(account.balance for account in bank.accounts.values())
+    failed = [0] * num_threads
+
+    def worker(index: int):
+        rng = random.Random(index)
+        for number in range(1, transfers_per_thread + 1):
+            source, recipient = rng.sample(account_numbers, 2)
+            if not bank.transfer(source, recipient, rng.randint(1, 50)):
+                failed[index] += 1
+            if number % 1000 == 0:
+                bank.commit()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    bank.commit()
+    elapsed = time.perf_counter() - start
+
+    total = num_threads * transfers_per_thread
+    total_after = sum(account.balance for account in bank.accounts.values())
+    bank.close()
+    reloaded = SQLiteBank(data_dir) if backend == "sqlite" else Bank(data_dir)
+    total_reloaded = sum(account.balance for account in reloaded.accounts.values())
+    reloaded.close()
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"{total} transfers ({sum(failed)} declined) on {num_threads} threads in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f} transfers/sec)")
+    print(f"Total balance before: {total_before:.2f}, after: {total_after:.2f}, "
+          f"after reload: {total_reloaded:.2f}")
+    assert total_before == total_after == total_reloaded, "Total balance was not conserved!"
+    print("Total balance conserved.")
+    return total / elapsed
+
+def benchmark_interest(num_accounts: int = 1_000_000, backend: str = "json"):
+    """
+    Time the batch interest run over a synthetic bank with a month of accrual and
+    report it against INTEREST_TARGET_SECONDS; the timing depends on the machine.
+    """
+    data_dir = tempfile.mkdtemp(prefix="bank_bench_")
+    bank = SQLiteBank(data_dir) if backend == "sqlite" else Bank(data_dir)
+    rng = random.Random(0)
+    month_ago = datetime.fromtimestamp(time.time() - 30 * 86400).isoformat()
+    account_types = ["savings", "checking", "business"]
+    for index in range(num_accounts):
+        account = BankAccount("bench", str(index).zfill(10), round(rng.uniform(-100, 50000), 2),
+                              rng.choice(account_types))
+        account.last_interest_calculation = month_ago
+        bank.accounts[account.account_number] = bank._attach_account(account)
+    if backend == "sqlite":
+        for account in bank.accounts.values():
+            bank._persist_account(account)
+        bank.commit()
+
+    target = INTEREST_TARGET_SECONDS[backend] * num_accounts / 1_000_000
+    start = time.perf_counter()
+    credited = bank.calculate_all_interest()
+    elapsed = time.perf_counter() - start
+    print(f"Credited interest to {credited} of {num_accounts} accounts in {elapsed:.2f}s "
+          f"({num_accounts / elapsed:,.0f} accounts/sec, target {target:.2f}s"
+          f"{'' if elapsed <= target else ', missed'})")
+    bank.close()
+    shutil.rmtree(data_dir, ignore_errors=True)
+    return elapsed
+
+def benchmark_velocity(num_events: int = 500_000, num_accounts: int = 10_000, burst_accounts: int = 50):
+    """
+    Replay a synthetic transaction stream through the velocity detector. A few
+    accounts get bursts of rapid withdrawals that every rule should catch.
+    """
+    rng = random.Random(0)
+    accounts = [BankAccount("bench", str(index).zfill(10)) for index in range(num_accounts)]
+    start_time = datetime(2024, 1, 1).timestamp()
+    clock = start_time
+    stream = []
+    for _ in range(num_events):
+        clock += rng.expovariate(10)  # ~10 events per second across the bank
+        if rng.random() < 0.01:
+            # A burst: 12 withdrawals from one account within about a minute
+            account = accounts[rng.randrange(burst_accounts)]
+            for _ in range(12):
+                clock += rng.uniform(1, 5)
+                transaction = Transaction("withdrawal", 1500.0, "Transfer to 0000000000")
+                transaction.timestamp = datetime.fromtimestamp(clock).isoformat()
+                stream.append((account, transaction))
+            continue
+        transaction = Transaction(rng.choice(["deposit", "withdrawal"]), round(rng.uniform(1, 500), 2))
+        transaction.timestamp = datetime.fromtimestamp(clock).isoformat()
+        stream.append((accounts[rng.randrange(num_accounts)], transaction))
+
+    by_rule: Dict[str, int] = {}
+    flagged = set()
+
+    def count_alert(alert: FraudAlert):
+        by_rule[alert.rule_name] = by_rule.get(alert.rule_name, 0) + 1
+        flagged.add(alert.account_number)
+
+    detector = VelocityDetector(on_alert=count_alert)
+    start = time.perf_counter()
+    for account, transaction in stream:
+        detector.observe(account, transaction)
+    elapsed = time.perf_counter() - start
+
+    print(f"Replayed {len(stream)} transactions in {elapsed:.2f}s ({len(stream) / elapsed:,.0f} events/sec)")
+    print(f"Alerts by rule: {by_rule}")
+    print(f"Accounts flagged: {len(flagged)} ({len(flagged - {a.account_number for a in accounts[:burst_accounts]})} "
+          f"outside the burst set)")
+    return elapsed
+
+class SQLiteBank(Bank):
+    """
+    Bank stored in SQLite: balances live in an accounts table and the history in a
+    transactions table indexed by (account_number, timestamp), so startup only
+    reads account rows and history pages are served by keyset queries.
+    """
+
+    def __init__(self, data_dir: str = "bank_data", db_file: str = BANK_DB_FILE):
+        self.db_path = os.path.join(data_dir, db_file)
+        super().__init__(data_dir)
+
+    def _load_data(self):
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db_lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                password_hash TEXT NOT NULL,
+                role TEXT NOT NULL,
+                accounts TEXT NOT NULL  -- JSON list of account numbers
+            );
+
+            CREATE TABLE IF NOT EXISTS accounts (
+                account_number TEXT PRIMARY KEY,
+                account_holder TEXT NOT NULL,
+                balance REAL NOT NULL,
+                account_type TEXT NOT NULL,
+                overdraft_limit REAL NOT NULL,
+                interest_rate REAL NOT NULL,
+                last_interest_calculation TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS transactions (
+                transaction_id TEXT PRIMARY KEY,
+                account_number TEXT NOT NULL REFERENCES accounts(account_number),
+                timestamp TEXT NOT NULL,
+                type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                description TEXT NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_transactions_account_time
+            ON transactions(account_number, timestamp, transaction_id);
+        ''')
+
+        # PRAGMA user_version records that the one-time JSON import has run. Databases from
+        # before the marker count as migrated once they hold any users or accounts.
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_JSON_IMPORTED:
+            if self.conn.execute(
+                    "SELECT EXISTS (SELECT 1 FROM users) OR EXISTS (SELECT 1 FROM accounts)").fetchone()[0] \
+                    or not self._import_json_data():
+                with self.db_lock, self.conn:
+                    self.conn.execute(f"PRAGMA user_version = {SCHEMA_JSON_IMPORTED}")
+
+        for username, password_hash, role, accounts in self.conn.execute("SELECT * FROM users"):
+            user = User(username, password_hash, role)
+            user.accounts = json.loads(accounts)
+            self.users[username] = user
+
+        columns = ("account_number", "account_holder", "balance", "account_type",
+                   "overdraft_limit", "interest_rate", "last_interest_calculation")
+        for row in self.conn.execute("SELECT * FROM accounts"):
+            self.accounts.add_raw(row[0], dict(zip(columns, row)))
+
+    def _attach_account(self, account: BankAccount) -> BankAccount:
+        account.history_store = self
+        return super()._attach_account(account)
+
+    def _import_json_data(self) -> bool:
+        """
+        One-time import of the JSON snapshot and the journal written since. A young
+        JSON bank may have nothing but a journal. Sets the import marker in the same
+        SQLite transaction; returns False if there was no JSON data at all.
+        """
+        journal_file = os.path.join(self.data_dir, JOURNAL_FILE)
+        if not os.path.exists(os.path.join(self.data_dir, "accounts.json")) and \
+                not os.path.exists(os.path.join(self.data_dir, "users.json")) and \
+                not (os.path.exists(journal_file) and os.path.getsize(journal_file)):
+            return False
+        Bank._load_data(self)
+        self.journal.close()
+        with self.db_lock, self.conn:
+            for user in self.users.values():
+                self._persist_user(user)
+            for account in self.accounts.values():
+                self._persist_account(account)
+                cold = [t for _, t in self.archive.read(account.account_number, 0, account.hot_offset)]
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?, ?)",
+                    [self._transaction_row(account, t) for t in cold + account.transactions]
+                )
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_JSON_IMPORTED}")
+        self.accounts, self.users = LazyAccounts(self._load_account), {}
+        print(f"Imported JSON bank data into {self.db_path}")
+        return True
+
+    @staticmethod
+    def _transaction_row(account: BankAccount, transaction: Transaction):
+        return (transaction.transaction_id, account.account_number, transaction.timestamp,
+                transaction.transaction_type, transaction.amount, transaction.description)
+
+    def _write_transaction(self, account: BankAccount, transaction: Transaction):
+        self.conn.execute("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)",
+                          self._transaction_row(account, transaction))
+        self.conn.execute(
+            "UPDATE accounts SET balance = ?, last_interest_calculation = ? WHERE account_number = ?",
+            (account.balance, account.last_interest_calculation, account.account_number)
+        )
+        # The rows are the history now; don't let the in-memory list grow
+        account.transactions.clear()
+
+    def _on_transaction(self, account: BankAccount, transaction: Transaction):
+        with self.db_lock:
+            self._write_transaction(account, transaction)
+        self._publish(account, transaction)
+
+    def _transfer_barrier(self):
+        # No snapshots here; this just keeps a commit from landing between the two legs
+        return self.db_lock
+
+    def _record_transfer(self, source: BankAccount, outgoing: Transaction,
+                         recipient: BankAccount, incoming: Transaction):
+        # Both legs go into the same (not yet committed) SQLite transaction
+        with self.db_lock:
+            self._write_transaction(source, outgoing)
+            self._write_transaction(recipient, incoming)
+        self._publish(source, outgoing)
+        self._publish(recipient, incoming)
+
+    def _record_interest(self, accounts: List[BankAccount], amounts: List[float],
+                         transaction_ids: List[str], timestamp: str):
+        account_numbers = [account.account_number for account in accounts]
+        with self.db_lock:
+            self.conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)",
+                                  zip(transaction_ids, account_numbers, repeat(timestamp), repeat("deposit"),
+                                      amounts, repeat("Interest payment")))
+            self.conn.executemany(
+                "UPDATE accounts SET balance = ?, last_interest_calculation = ? WHERE account_number = ?",
+                zip([account.balance for account in accounts], repeat(timestamp), account_numbers)
+            )
+        if self.listeners:
+            for account, amount, transaction_id in zip(accounts, amounts, transaction_ids):
+                self._publish(account, Transaction.restore("deposit", amount, "Interest payment",
+                                                           transaction_id, timestamp))
+
+    def _persist_account(self, account: BankAccount):
+        account.history_store = self
+        with self.db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (account.account_number, account.account_holder, account.balance, account.account_type,
+                 account.overdraft_limit, account.interest_rate, account.last_interest_calculation)
+            )
+
+    def _persist_user(self, user: User):
+        with self.db_lock:
+            self.conn.execute("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)",
+                              (user.username, user.password_hash, user.role, json.dumps(user.accounts)))
+
+    def get_statements(self, account_number: str) -> List[MonthlyStatement]:
+        """Monthly statements computed from the transactions table, oldest first."""
+        account = self.get_account(account_number)
+        if account is None:
+            return []
+        with self.db_lock:
+            rows = self.conn.execute('''
+                SELECT substr(timestamp, 1, 7) AS month,
+                       SUM(CASE WHEN type = 'deposit' THEN amount ELSE 0 END),
+                       SUM(CASE WHEN type = 'withdrawal' THEN amount ELSE 0 END),
+                       COUNT(*)
+                FROM transactions WHERE account_number = ?
+                GROUP BY month ORDER BY month DESC
+            ''', (account_number,)).fetchall()
+
+        statements, closing = [], account.balance
+        for month, deposits, withdrawals, count in rows:
+            opening = closing - deposits + withdrawals
+            statements.append(MonthlyStatement(month, round(opening, 2), round(closing, 2),
+                                               round(deposits, 2), round(withdrawals, 2), count))
+            closing = opening
+        return statements[::-1]
+
+    def fetch_history(self, account_number: str, limit: int = 10,
+                      before: Optional[Transaction] = None) -> List[Transaction]:
+        """Keyset-paginated history: the limit transactions before the given one, oldest first."""
+        query = "SELECT type, amount, description, transaction_id, timestamp FROM transactions WHERE account_number = ?"
+        params: list = [account_number]
+        if before is not None:
+            query += " AND (timestamp, transaction_id) < (?, ?)"
+            params += [before.timestamp, before.transaction_id]
+        query += " ORDER BY timestamp DESC, transaction_id DESC LIMIT ?"
+        params.append(limit)
+
+        with self.db_lock:
+            rows = self.conn.execute(query, params).fetchall()
+        history = []
+        for transaction_type, amount, description, transaction_id, timestamp in reversed(rows):
+            history.append(Transaction.restore(transaction_type, amount, description, transaction_id, timestamp))
+        return history
+
+    def commit(self, compact: bool = True):
+        with self.db_lock:
+            self.conn.commit()
+
+    def _save_data(self, now: Optional[datetime] = None, roll_up_all: bool = False):
+        # Nothing to snapshot or roll up: statements are computed from the transactions table
+        self.commit()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+def open_bank(data_dir: str = "bank_data") -> Bank:
+    """Open the bank with the storage backend selected by BANK_BACKEND."""
+    if BANK_BACKEND == "sqlite":
+        return SQLiteBank(data_dir)
+    return Bank(data_dir)
+
 def print_main_menu():
     print("\n=== Bank Management System ===")
     print("1. Login")
@@ -472,11 +1717,14 @@ def print_customer_menu():
     print("5. View Balance")
     print("6. Transaction History")
     print("7. List Accounts")
-    print("8. Logout")
+    print("8. Monthly Statements")
+    print("9. Logout")
     print("=====================")
 
 def main():
-    bank = Bank()
+    bank = open_bank()
+    detector = VelocityDetector(on_alert=lambda alert: print(f"ALERT {alert}"))
+    bank.listeners.append(detector.observe)
     
     while True:
         if not bank.current_user:
@@ -494,6 +1742,7 @@ def main():
                 bank.register(username, password)
 
             elif choice == '3':  # Exit
+                bank.close()
                 print("Thank you for using our bank system. Goodbye!")
                 break
 
@@ -528,7 +1777,7 @@ def main():
                         amount = float(input("Enter deposit amount: "))
                         description = input("Enter description (optional): ")
                         account.deposit(amount, description)
-                        bank._save_data()
+                        bank.commit()
                     except ValueError:
                         print("Invalid amount entered.")
                 else:
@@ -542,7 +1791,7 @@ def main():
                         amount = float(input("Enter withdrawal amount: "))
                         description = input("Enter description (optional): ")
                         account.withdraw(amount, description)
-                        bank._save_data()
+                        bank.commit()
                     except ValueError:
                         print("Invalid amount entered.")
                 else:
@@ -560,8 +1809,11 @@ def main():
                         try:
                             amount = float(input("Enter transfer amount: "))
                             description = input("Enter description (optional): ")
-                            if from_account.transfer(amount, to_account, description):
-                                bank._save_data()
+                            if bank.transfer(from_account_num, to_account_num, amount, description):
+                                print(f"Transferred {amount:.2f} to account {to_account_num}")
+                                bank.commit()
+                            else:
+                                print("Transfer failed: check the amount and available funds.")
                         except ValueError:
                             print("Invalid amount entered.")
                     else:
@@ -595,7 +1847,20 @@ def main():
                 for account in accounts:
                     print(f"Account {account.account_number} ({account.account_type}): {account.balance:.2f}")
 
-            elif choice == '8':  # Logout
+            elif choice == '8':  # Monthly Statements
+                account_number = input("Enter account number: ")
+                if account_number in bank.current_user.accounts and bank.get_account(account_number):
+                    statements = bank.get_statements(account_number)
+                    if not statements:
+                        print("No monthly statements yet.")
+                    for st in statements:
+                        print(f"{st.month}: opening {st.opening_balance:.2f}, deposits {st.total_deposits:.2f}, "
+                              f"withdrawals {st.total_withdrawals:.2f}, closing {st.closing_balance:.2f} "
+                              f"({st.transaction_count} transactions)")
+                else:
+                    print("Account not found or not authorized.")
+
+            elif choice == '9':  # Logout
                 bank.current_user = None
                 print("Successfully logged out.")
 
@@ -603,9 +1868,20 @@ def main():
                 print("Invalid choice, please try again.")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark-transfers":
+        benchmark_transfers(backend=sys.argv[2] if len(sys.argv) > 2 else "json")
+        sys.exit()
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark-interest":
+        benchmark_interest(backend=sys.argv[2] if len(sys.argv) > 2 else "json")
+        sys.exit()
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark-velocity":
+        benchmark_velocity()
+        sys.exit()
+
     # Create an admin user if none exists
-    if not os.path.exists("bank_data/users.json"):
-        bank = Bank()
+    bank = open_bank()
+    if "admin" not in bank.users:
         bank.register("admin", "admin123", "admin")
+    bank.close()
     
     main()
\ No newline at end of file
@@ -1,5 +1,43 @@
 import random
 import string
+import math
+import time
+
+BULK_THRESHOLD = 1000  # more names than this are streamed to a file
+
+class BloomFilter:
+    """Compact probabilistic set: never misses an added item, rarely reports a false match."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)  # a request for zero names still needs a non-zero size
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item):
+        """Add item; returns False if it was (probably) already present."""
+        # Double hashing: derive all probe positions from one 64-bit hash
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        position, step = value & 0xFFFFFFFF, (value >> 32) | 1
+        bits, size, new = self.bits, self.size, False
+        for _ in range(self.hash_count):
+            position %= size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+            position += step
+        return new
+
+    def __contains__(self, item):
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        position, step = value & 0xFFFFFFFF, (value >> 32) | 1
+        for _ in range(self.hash_count):
+            position %= self.size
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
 
 class BrandNameGenerator:
     def __init__(self, prefix_list=None, suffix_list=None):
@@ -18,7 +56,7 @@ class BrandNameGenerator:
         """Generate a random prefix for the brand name."""
         return random.choice(self.prefix_list)
     
-    def generate_random_brand_name(self, base_name):
+    def generate_random_brand_name(self, base_name, random_length=3):
         """Generate a brand name by appending a random suffix or prefix to the base name."""
         # Randomly decide to add a prefix or a suffix
         add_prefix = random.choice([True, False])
@@ -29,8 +67,62 @@ class BrandNameGenerator:
             brand_name = base_name + self.generate_random_suffix()
         
         # Add some random characters at the end for uniqueness
-        random_chars = ''.join(random.choices(self.character_pool, k=3))  # Adding 3 random characters
+        random_chars = ''.join(random.choices(self.character_pool, k=random_length))  # Adding 3 random characters by default
         return brand_name + random_chars
+
+    @staticmethod
+    def load_exclusion_index(file_path):
+        """Load existing trademarks/domains (one per line) into a hashed, case-insensitive index."""
+        with open(file_path, "r", encoding="utf-8") as f:
+            return frozenset(line.strip().lower() for line in f if line.strip())
+
+    def generate_unique_brand_names(self, base_name, count, output_path, exclusion_index=frozenset(),
+                                    random_length=3, use_bloom_filter=False, batch_size=10000):
+        """
+        Stream up to count unique brand names to output_path, one per line.
+
+        Duplicates are filtered through an exact set, or a Bloom filter when memory
+        matters more than speed, and names found in exclusion_index are rejected. Stops early if the name space runs
+        dry; raise random_length for larger runs. Returns (written, rejected, names/sec).
+        """
+        bloom_filter = BloomFilter(count) if use_bloom_filter else None
+        seen = set()
+        # Give up after this many rejections in a row: the name space is exhausted
+        max_misses = 10000
+        written, rejected, misses = 0, 0, 0
+        batch = []
+        start = time.perf_counter()
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            while written < count and misses < max_misses:
+                name = self.generate_random_brand_name(base_name, random_length)
+                key = name.lower()
+                if bloom_filter is not None:
+                    is_new = bloom_filter.add(key)
+                else:
+                    is_new = key not in seen
+                    seen.add(key)
+                if not is_new or key in exclusion_index:
+                    rejected += 1
+                    misses += 1
+                    continue
+                misses = 0
+                batch.append(name + "\n")
+                written += 1
+                if len(batch) >= batch_size:
+                    f.writelines(batch)
+                    batch = []
+                    if written % (batch_size * 10) == 0:
+                        elapsed = time.perf_counter() - start
+                        print(f"{written} names ({written / elapsed:,.0f} names/sec)")
+            f.writelines(batch)
+
+        elapsed = time.perf_counter() - start
+        rate = written / elapsed if elapsed else 0.0
+        print(f"Wrote {written} unique names to {output_path} ({rejected} rejected) at {rate:,.0f} names/sec")
+        if written < count:
+            print("Stopped early: no new names left; try a longer random part.")
+        return written, rejected, rate
     
     def get_user_input(self):
         """Get the base name from the user for brand generation."""
@@ -46,6 +138,18 @@ class BrandNameGenerator:
             brand_name = self.generate_random_brand_name(base_name)
             print(f"- {brand_name}")
 
+    def bulk_generate(self, base_name, count):
+        """Ask for bulk generation settings and stream the names to a file."""
+        output_path = input("Output file (default is brand_names.txt): ").strip() or "brand_names.txt"
+        exclusion_path = input("Exclusion list file of existing trademarks/domains (optional): ").strip()
+        exclusion_index = self.load_exclusion_index(exclusion_path) if exclusion_path else frozenset()
+        # Each random character multiplies the name space by 36
+        random_length = max(3, math.ceil(math.log(max(count, 1) * 10, 36)) - 1)
+        # The Bloom filter keeps duplicate checks to about 2 bytes per name but may reject a few new ones
+        use_bloom_filter = input("Save memory with a Bloom filter? (yes/no, default is no): ").strip().lower() == "yes"
+        self.generate_unique_brand_names(base_name, count, output_path, exclusion_index, random_length,
+                                         use_bloom_filter)
+
     def play_game(self):
         """Main game loop."""
         while True:
@@ -58,7 +162,11 @@ class BrandNameGenerator:
             else:
                 num_names = int(num_names)
             
-            self.generate_and_display_brand_names(base_name, num_names)
+            # Large requests are written to a file instead of the screen
+            if num_names > BULK_THRESHOLD:
+                self.bulk_generate(base_name, num_names)
+            else:
+                self.generate_and_display_brand_names(base_name, num_names)
             
             play_again = input("\nDo you want to generate more brand names? (yes/no): ").strip().lower()
             if play_again != "yes":
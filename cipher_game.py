@@ -1,42 +1,417 @@
 import random
 import string
+import math
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
-# Caesar Cipher Function
-def caesar_cipher(text, shift, mode='encrypt'):
-    result = ""
-    for char in text:
+CHUNK_SIZE = 1 << 20  # characters (or bytes) processed per chunk when streaming files
+
+# Relative letter frequencies of English text, used to score Caesar shifts
+ENGLISH_LETTER_FREQUENCIES = [
+    0.08167, 0.01492, 0.02782, 0.04253, 0.12702, 0.02228, 0.02015, 0.06094, 0.06966,
+    0.00153, 0.00772, 0.04025, 0.02406, 0.06749, 0.07507, 0.01929, 0.00095, 0.05987,
+    0.06327, 0.09056, 0.02758, 0.00978, 0.02360, 0.00150, 0.01974, 0.00074
+]
+
+# Quadgram statistics ("TION 13168375" per line); a packed binary copy is cached next to it
+QUADGRAM_FILE = "english_quadgrams.txt"
+QUADGRAM_TABLE_SIZE = 26 ** 4
+SMOOTHING_WEIGHT = 0.6  # share of a smoothed probability taken from the longer context
+
+# Simulated annealing before each final hill climb: swaps tried, and the starting temperature
+# (in log10 score units) that cools linearly to zero so early moves can escape local maxima
+ANNEAL_STEPS = 5000
+ANNEAL_TEMPERATURE = 8.0
+MIN_RECOVERY = 0.9  # share of letters the benchmark must recover
+
+# Small built-in corpus used when no quadgram file is available
+SAMPLE_ENGLISH = """
+It was the best of times, it was the worst of times, it was the age of wisdom, it was the age of
+foolishness, it was the epoch of belief, it was the epoch of incredulity, it was the season of Light,
+it was the season of Darkness, it was the spring of hope, it was the winter of despair, we had
+everything before us, we had nothing before us, we were all going direct to Heaven, we were all going
+direct the other way. In short, the period was so far like the present period, that some of its
+noisiest authorities insisted on its being received, for good or for evil, in the superlative degree
+of comparison only. There were a king with a large jaw and a queen with a plain face, on the throne of
+England; there were a king with a large jaw and a queen with a fair face, on the throne of France. In
+both countries it was clearer than crystal to the lords of the State preserves of loaves and fishes,
+that things in general were settled for ever. It is a truth universally acknowledged, that a single
+man in possession of a good fortune, must be in want of a wife. However little known the feelings or
+views of such a man may be on his first entering a neighbourhood, this truth is so well fixed in the
+minds of the surrounding families, that he is considered the rightful property of some one or other of
+their daughters. Call me Ishmael. Some years ago, never mind how long precisely, having little or no
+money in my purse, and nothing particular to interest me on shore, I thought I would sail about a
+little and see the watery part of the world. It is a way I have of driving off the spleen and
+regulating the circulation. Whenever I find myself growing grim about the mouth; whenever it is a damp,
+drizzly November in my soul; then, I account it high time to get to sea as soon as I can.
+"""
+
+# Benchmark text kept out of SAMPLE_ENGLISH, so the fallback table never scores its own training data
+HELD_OUT_ENGLISH = """
+Alice was beginning to get very tired of sitting by her sister on the bank, and of having nothing to
+do: once or twice she had peeped into the book her sister was reading, but it had no pictures or
+conversations in it, and what is the use of a book, thought Alice, without pictures or conversations?
+So she was considering in her own mind, as well as she could, for the hot day made her feel very
+sleepy and stupid, whether the pleasure of making a daisy chain would be worth the trouble of getting
+up and picking the daisies, when suddenly a White Rabbit with pink eyes ran close by her. You will
+rejoice to hear that no disaster has accompanied the commencement of an enterprise which you have
+regarded with such evil forebodings. I arrived here yesterday, and my first task is to assure my dear
+sister of my welfare and increasing confidence in the success of my undertaking.
+"""
+
+
+# Translation table for str.translate that applies the Caesar rule per code point.
+# ASCII is filled in up front; any other character is resolved on first use and cached.
+class _CaesarTable(dict):
+    def __init__(self, shift_amount):
+        super().__init__()
+        self.shift_amount = shift_amount
+        for code in range(128):
+            self[code]
+
+    def __missing__(self, code):
+        char = chr(code)
         if char.isalpha():
-            # Get ASCII value of character
-            shift_amount = shift if mode == 'encrypt' else -shift
             start = ord('A') if char.isupper() else ord('a')
-            # Apply Caesar cipher formula
-            new_char = chr((ord(char) - start + shift_amount) % 26 + start)
-            result += new_char
+            value = (code - start + self.shift_amount) % 26 + start
         else:
-            result += char  # Non-alphabet characters are not encrypted
-    return result
+            value = code  # Non-alphabet characters are not encrypted
+        self[code] = value
+        return value
 
 
-# Substitution Cipher Function
-def substitution_cipher(text, key, mode='encrypt'):
-    alphabet = string.ascii_lowercase
-    key_dict = dict(zip(alphabet, key))
-    
+# Same idea for the substitution cipher, preserving case like the original loop
+class _SubstitutionTable(dict):
+    def __init__(self, key_dict):
+        super().__init__()
+        self.key_dict = key_dict
+        for code in range(128):
+            try:
+                self[code]
+            except ValueError:
+                pass  # Letters missing from a partial key only fail if they are used
+
+    def __missing__(self, code):
+        char = chr(code)
+        if char.isalpha():
+            new_char = self.key_dict.get(char.lower())
+            if new_char is None:
+                raise ValueError(f"Character {char!r} is not covered by the substitution key")
+            value = new_char.upper() if char.isupper() else new_char
+        else:
+            value = code  # Non-alphabet characters are not encrypted
+        self[code] = value
+        return value
+
+
+def _substitution_key_dict(key, mode):
+    key_dict = dict(zip(string.ascii_lowercase, key))
     if mode == 'decrypt':
         key_dict = {v: k for k, v in key_dict.items()}  # Invert the key for decryption
+    return key_dict
 
-    result = ""
-    for char in text:
-        if char.isalpha():
-            new_char = key_dict[char.lower()]
-            # Preserve the case (uppercase or lowercase)
-            if char.isupper():
-                result += new_char.upper()
-            else:
-                result += new_char
+
+@lru_cache(maxsize=64)
+def caesar_table(shift, mode='encrypt'):
+    shift_amount = shift if mode == 'encrypt' else -shift
+    return _CaesarTable(shift_amount % 26)
+
+
+@lru_cache(maxsize=64)
+def substitution_table(key, mode='encrypt'):
+    return _SubstitutionTable(_substitution_key_dict(key, mode))
+
+
+# Byte tables for streaming raw files: only ASCII letters change, every other byte passes through
+@lru_cache(maxsize=64)
+def caesar_bytes_table(shift, mode='encrypt'):
+    table = caesar_table(shift, mode)
+    letters = string.ascii_letters
+    return bytes.maketrans(letters.encode(), ''.join(chr(table[ord(c)]) for c in letters).encode())
+
+
+@lru_cache(maxsize=64)
+def substitution_bytes_table(key, mode='encrypt'):
+    key_dict = _substitution_key_dict(key, mode)
+    source, target = '', ''
+    for letter in string.ascii_lowercase:
+        new_char = key_dict.get(letter)
+        if new_char is None or not (new_char.isascii() and new_char.isalpha() and len(new_char) == 1):
+            raise ValueError("Byte mode needs a key made of 26 ASCII letters")
+        source += letter + letter.upper()
+        target += new_char + new_char.upper()
+    return bytes.maketrans(source.encode(), target.encode())
+
+
+# Caesar Cipher Function
+def caesar_cipher(text, shift, mode='encrypt'):
+    return text.translate(caesar_table(shift, mode))
+
+
+# Substitution Cipher Function
+def substitution_cipher(text, key, mode='encrypt'):
+    return text.translate(substitution_table(key, mode))
+
+
+# Encrypt or decrypt a whole file in fixed-size chunks
+def cipher_file(input_path, output_path, cipher, key, mode='encrypt', chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """
+    Stream input_path through the Caesar ('caesar', key = shift) or substitution
+    ('substitution', key = 26 letters) cipher into output_path.
+
+    Text is decoded with the given encoding and gives exactly the same result as
+    the string functions. With encoding=None the file is processed as raw bytes,
+    which is faster and matches the string functions for ASCII text.
+    """
+    if cipher not in ('caesar', 'substitution'):
+        raise ValueError("cipher must be 'caesar' or 'substitution'")
+
+    if encoding is None:
+        if cipher == 'caesar':
+            table = caesar_bytes_table(key, mode)
+        else:
+            table = substitution_bytes_table(key, mode)
+        with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
+            while chunk := src.read(chunk_size):
+                dst.write(chunk.translate(table))
+        return
+
+    table = caesar_table(key, mode) if cipher == 'caesar' else substitution_table(key, mode)
+    # newline='' keeps line endings byte-for-byte
+    with open(input_path, 'r', encoding=encoding, newline='') as src, \
+            open(output_path, 'w', encoding=encoding, newline='') as dst:
+        while chunk := src.read(chunk_size):
+            dst.write(chunk.translate(table))
+
+
+# ==================== CIPHER BREAKING ====================
+
+def _letter_indices(text):
+    """Ciphertext letters as 0-25 indices, everything else dropped."""
+    return [ord(c) - 97 for c in text.lower() if 'a' <= c <= 'z']
+
+
+# Break a Caesar cipher by chi-squared scoring of all 26 shifts
+def crack_caesar(ciphertext):
+    """Return (shift, plaintext) for the shift whose decryption looks most like English."""
+    counts = [0] * 26
+    for index in _letter_indices(ciphertext):
+        counts[index] += 1
+    total = sum(counts)
+    if total == 0:
+        return 0, ciphertext
+
+    best_shift, best_score = 0, math.inf
+    for shift in range(26):
+        # Plain letter p appears in the ciphertext as (p + shift) % 26
+        score = 0.0
+        for plain in range(26):
+            expected = ENGLISH_LETTER_FREQUENCIES[plain] * total
+            observed = counts[(plain + shift) % 26]
+            score += (observed - expected) ** 2 / expected
+        if score < best_score:
+            best_shift, best_score = shift, score
+    return best_shift, caesar_cipher(ciphertext, best_shift, 'decrypt')
+
+
+# Quadgram log-probabilities as a flat array indexed by ((a*26 + b)*26 + c)*26 + d
+def build_quadgram_table(counts):
+    """counts maps packed quadgram index -> occurrences."""
+    total = sum(counts.values())
+    floor = math.log10(0.01 / total)
+    table = array('d', [floor]) * QUADGRAM_TABLE_SIZE
+    for index, count in counts.items():
+        table[index] = math.log10(count / total)
+    return table
+
+
+# Quadgram table derived from a small corpus, smoothed so unseen quadgrams still score sensibly
+def smoothed_quadgram_table(text):
+    """
+    P(abcd) = P(a) P(b|a) P(c|ab) P(d|abc), where each conditional mixes the corpus
+    count with the next shorter context. A quadgram the corpus never saw scores by
+    how English its pieces are instead of all sharing one floor value.
+    """
+    letters = _letter_indices(text)
+    unigrams = Counter(letters)
+    bigrams = Counter(zip(letters, letters[1:]))
+    trigrams = Counter(zip(letters, letters[1:], letters[2:]))
+    quadgrams = Counter(zip(letters, letters[1:], letters[2:], letters[3:]))
+
+    def mix(count, context, shorter):
+        if not context:
+            return shorter
+        return SMOOTHING_WEIGHT * count / context + (1 - SMOOTHING_WEIGHT) * shorter
+
+    def p1(d):
+        return (unigrams[d] + 0.5) / (len(letters) + 13)
+
+    def p2(c, d):
+        return mix(bigrams[c, d], unigrams[c], p1(d))
+
+    def p3(b, c, d):
+        return mix(trigrams[b, c, d], bigrams[b, c], p2(c, d))
+
+    def p4(a, b, c, d):
+        return mix(quadgrams[a, b, c, d], trigrams[a, b, c], p3(b, c, d))
+
+    table = array('d', [0.0]) * QUADGRAM_TABLE_SIZE
+    index = 0
+    for a in range(26):
+        pa = p1(a)
+        for b in range(26):
+            pab = pa * p2(a, b)
+            for c in range(26):
+                pabc = pab * p3(a, b, c)
+                for d in range(26):
+                    table[index] = math.log10(pabc * p4(a, b, c, d))
+                    index += 1
+    return table
+
+
+def load_quadgram_table(path=QUADGRAM_FILE):
+    """Load quadgram statistics, preferring the packed binary cache; falls back to the built-in corpus."""
+    binary_path = path + ".bin"
+    if os.path.exists(binary_path) and (not os.path.exists(path)
+                                        or os.path.getmtime(binary_path) >= os.path.getmtime(path)):
+        table = array('d')
+        with open(binary_path, 'rb') as f:
+            table.fromfile(f, QUADGRAM_TABLE_SIZE)
+        return table
+
+    if not os.path.exists(path):
+        print(f"'{path}' not found, using the small built-in corpus (long ciphertexts crack more reliably).")
+        return smoothed_quadgram_table(SAMPLE_ENGLISH)
+
+    counts = Counter()
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 2 and len(parts[0]) == 4 and parts[0].isalpha():
+                a, b, c, d = _letter_indices(parts[0])
+                counts[((a * 26 + b) * 26 + c) * 26 + d] += int(parts[1])
+    table = build_quadgram_table(counts)
+    with open(binary_path, 'wb') as f:
+        table.tofile(f)
+    return table
+
+
+_worker_table = None
+
+
+def _init_cracker(table):
+    global _worker_table
+    _worker_table = table
+
+
+def _score_key(table, quadgrams, key):
+    """Sum of log-probabilities of the decrypted quadgrams, weighted by how often each occurs."""
+    score = 0.0
+    for (a, b, c, d), count in quadgrams:
+        score += count * table[((key[a] * 26 + key[b]) * 26 + key[c]) * 26 + key[d]]
+    return score
+
+
+# One annealing run from a random key, finished by hill climbing (runs inside worker processes)
+def _hill_climb(args):
+    quadgrams, seed, max_stale, anneal_steps = args
+    table = _worker_table
+    rng = random.Random(seed)
+    key = list(range(26))  # key[cipher letter] = plain letter
+    rng.shuffle(key)
+    current = best = _score_key(table, quadgrams, key)
+    best_key = key[:]
+    evaluated, stale = 1, 0
+
+    for step in range(anneal_steps):
+        temperature = ANNEAL_TEMPERATURE * (1 - step / anneal_steps)
+        i, j = rng.sample(range(26), 2)
+        key[i], key[j] = key[j], key[i]
+        score = _score_key(table, quadgrams, key)
+        evaluated += 1
+        if score >= current or rng.random() < math.exp((score - current) / temperature):
+            current = score
+            if score > best:
+                best, best_key = score, key[:]
+        else:
+            key[i], key[j] = key[j], key[i]
+
+    key = best_key
+    while stale < max_stale:
+        i, j = rng.sample(range(26), 2)
+        key[i], key[j] = key[j], key[i]
+        score = _score_key(table, quadgrams, key)
+        evaluated += 1
+        if score > best:
+            best, stale = score, 0
         else:
-            result += char  # Non-alphabet characters are not encrypted
-    return result
+            key[i], key[j] = key[j], key[i]
+            stale += 1
+    return best, key, evaluated
+
+
+# Break a substitution cipher with parallel annealing restarts
+def crack_substitution(ciphertext, table=None, restarts=8, max_stale=2000, workers=None, seed=None,
+                       anneal_steps=ANNEAL_STEPS):
+    """
+    Return (key, plaintext, stats). The key is in the same format substitution_cipher
+    expects, and stats holds keys evaluated, elapsed seconds and keys/sec.
+    """
+    table = table or load_quadgram_table()
+    letters = _letter_indices(ciphertext)
+    quadgrams = list(Counter(zip(letters, letters[1:], letters[2:], letters[3:])).items())
+    seeds = random.Random(seed).sample(range(1 << 30), restarts)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_cracker, initargs=(table,)) as pool:
+        results = list(pool.map(_hill_climb, [(quadgrams, s, max_stale, anneal_steps) for s in seeds]))
+    elapsed = time.perf_counter() - start
+
+    _, decrypt_key, _ = max(results, key=lambda result: result[0])
+    evaluated = sum(result[2] for result in results)
+    # Turn cipher->plain into the plain->cipher key string used by substitution_cipher
+    key = [''] * 26
+    for cipher_letter, plain_letter in enumerate(decrypt_key):
+        key[plain_letter] = string.ascii_lowercase[cipher_letter]
+    key = ''.join(key)
+
+    stats = {
+        'keys_evaluated': evaluated,
+        'seconds': elapsed,
+        'keys_per_second': evaluated / elapsed if elapsed else 0.0,
+    }
+    return key, substitution_cipher(ciphertext, key, 'decrypt'), stats
+
+
+# Benchmark: encrypt a known text with a random key and time how long cracking takes
+def benchmark_cracking(plaintext=HELD_OUT_ENGLISH, restarts=8, workers=None, table=None,
+                       min_recovery=MIN_RECOVERY):
+    if table is None and not os.path.exists(QUADGRAM_FILE) and not os.path.exists(QUADGRAM_FILE + ".bin"):
+        print(f"Note: without '{QUADGRAM_FILE}' the scores come from the small built-in corpus; "
+              f"results are a lower bound on what the full statistics achieve.")
+    table = table or load_quadgram_table()
+    key = generate_substitution_key()
+    ciphertext = substitution_cipher(plaintext, key)
+
+    shift = random.randint(1, 25)
+    start = time.perf_counter()
+    found_shift, _ = crack_caesar(caesar_cipher(plaintext, shift))
+    caesar_seconds = time.perf_counter() - start
+    print(f"Caesar: shift {shift} {'recovered' if found_shift == shift else 'MISSED'} in {caesar_seconds * 1000:.2f} ms")
+
+    found_key, recovered, stats = crack_substitution(ciphertext, table, restarts=restarts, workers=workers)
+    letters = [c for c in plaintext.lower() if c.isalpha()]
+    correct = sum(a == b for a, b in zip(letters, (c for c in recovered.lower() if c.isalpha())))
+    print(f"Substitution: {stats['keys_evaluated']} keys evaluated in {stats['seconds']:.2f}s "
+          f"({stats['keys_per_second']:,.0f} keys/sec), {correct / len(letters):.1%} of letters recovered")
+    if correct / len(letters) < min_recovery:
+        raise AssertionError(f"recovered {correct / len(letters):.1%} of letters, expected at least {min_recovery:.0%}")
+    return stats
 
 
 # Generate random substitution key
@@ -51,8 +426,10 @@ def display_menu():
     print("\n==== Cipher Game ====")
     print("1. Caesar Cipher")
     print("2. Substitution Cipher")
-    print("3. Exit")
-    choice = input("Choose a cipher (1/2/3): ")
+    print("3. Encrypt/Decrypt a File")
+    print("4. Crack a Ciphertext")
+    print("5. Exit")
+    choice = input("Choose an option (1/2/3/4/5): ")
     return choice
 
 
@@ -93,6 +470,47 @@ def substitution_game():
         print("Invalid choice! Please choose either 'e' for encrypt or 'd' for decrypt.")
 
 
+# Function for encrypting or decrypting a whole file
+def file_game():
+    input_path = input("Enter the path of the file to process: ")
+    output_path = input("Enter the path for the result: ")
+    cipher = input("Which cipher? Caesar or Substitution (c/s): ").lower()
+    mode = input("Do you want to Encrypt or Decrypt? (e/d): ").lower()
+    mode = 'encrypt' if mode == 'e' else 'decrypt'
+
+    if cipher == 'c':
+        key = int(input("Enter the shift value (1-25): "))
+        cipher_file(input_path, output_path, 'caesar', key, mode)
+    elif cipher == 's':
+        key = input("Enter the substitution key (26 characters, without repeating letters): ").lower()
+        if len(key) != 26 or len(set(key)) != 26 or not key.isalpha():
+            print("Invalid key! The key must contain exactly 26 characters and no repeating letters.")
+            return
+        cipher_file(input_path, output_path, 'substitution', key, mode)
+    else:
+        print("Invalid choice! Please choose either 'c' for Caesar or 's' for Substitution.")
+        return
+    print(f"Result written to {output_path}")
+
+
+# Function for breaking a ciphertext without the key
+def crack_game():
+    text = input("Enter the ciphertext to crack: ")
+    cipher = input("Which cipher was used? Caesar or Substitution (c/s): ").lower()
+
+    if cipher == 'c':
+        shift, plaintext = crack_caesar(text)
+        print(f"Most likely shift: {shift}")
+        print(f"Decrypted Text: {plaintext}")
+    elif cipher == 's':
+        key, plaintext, stats = crack_substitution(text)
+        print(f"Most likely key: {key}")
+        print(f"Decrypted Text: {plaintext}")
+        print(f"({stats['keys_evaluated']} keys in {stats['seconds']:.2f}s, {stats['keys_per_second']:,.0f} keys/sec)")
+    else:
+        print("Invalid choice! Please choose either 'c' for Caesar or 's' for Substitution.")
+
+
 # Main function to run the Cipher Game
 def run_cipher_game():
     while True:
@@ -102,6 +520,10 @@ def run_cipher_game():
         elif choice == '2':
             substitution_game()
         elif choice == '3':
+            file_game()
+        elif choice == '4':
+            crack_game()
+        elif choice == '5':
             print("Exiting Cipher Game. Goodbye!")
             break
         else:
@@ -109,4 +531,8 @@ def run_cipher_game():
 
 # Start the game
 if __name__ == "__main__":
+    # python cipher_game.py benchmark [restarts]
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark_cracking(restarts=int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+        sys.exit()
     run_cipher_game()
@@ -1,29 +1,224 @@
 import requests
+import numpy as np
+import datetime
+import json
+import os
+import time
+
+CACHE_FILE = "exchange_rates_cache.json"
+CACHE_TTL = 3600  # seconds before the cached rate table is refreshed
+REQUEST_TIMEOUT = 10  # seconds
+BULK_BLOCK_SIZE = 16 << 20  # bytes of CSV parsed per chunk in bulk conversions
+HISTORY_DIR = "rate_history"
+
+class RateHistoryStore:
+    """
+    Local time series of daily base-currency rate snapshots.
+
+    Stored as one .npy column per currency plus a sorted dates.npy, all
+    memory-mapped on load. Lookups are "as of" a date: the latest snapshot
+    on or before it that has a rate for the currency.
+    """
+
+    def __init__(self, directory=HISTORY_DIR, base_currency="USD"):
+        self.directory = directory
+        self.base_currency = base_currency
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def _load(self):
+        dates_file = self._path("dates")
+        if os.path.exists(dates_file):
+            self.dates = np.load(dates_file, mmap_mode="r")
+        else:
+            self.dates = np.empty(0, dtype="datetime64[D]")
+        currencies_file = os.path.join(self.directory, "currencies.json")
+        if os.path.exists(currencies_file):
+            with open(currencies_file, "r") as f:
+                self.currencies = json.load(f)
+        else:
+            self.currencies = []
+        self._columns = {}
+        self._latest = {}
+
+    def column(self, currency):
+        """Memory-mapped rates of one currency per snapshot date, or None if never seen."""
+        if currency not in self._columns:
+            if currency == self.base_currency and currency not in self.currencies:
+                self._columns[currency] = np.ones(len(self.dates))
+            elif currency in self.currencies:
+                self._columns[currency] = np.load(self._path(currency), mmap_mode="r")
+            else:
+                return None
+        return self._columns[currency]
+
+    def _save_array(self, name, array):
+        temp_file = self._path(name) + ".tmp"
+        with open(temp_file, "wb") as f:
+            np.save(f, array)
+        os.replace(temp_file, self._path(name))
+
+    def import_snapshots(self, snapshots):
+        """Merges (date, rates) pairs into the store, rewriting each column once."""
+        snapshots = {np.datetime64(date, "D"): rates for date, rates in snapshots}
+        if not snapshots:
+            return 0
+
+        # Copies, dropping this store's maps before their files are replaced: Windows
+        # can't replace a file while it is still memory-mapped
+        old_dates = np.array(self.dates)
+        self.dates = old_dates
+        new_dates = np.union1d(old_dates, np.array(sorted(snapshots), dtype="datetime64[D]"))
+        old_positions = np.searchsorted(new_dates, old_dates)
+        currencies = sorted(set(self.currencies).union(*(rates.keys() for rates in snapshots.values())))
+
+        for currency in currencies:
+            values = np.full(len(new_dates), np.nan)
+            if currency in self.currencies:
+                values[old_positions] = self.column(currency)
+                self._columns.pop(currency)  # the last reference, so the map is closed
+            for date, rates in snapshots.items():
+                if currency in rates:
+                    values[np.searchsorted(new_dates, date)] = rates[currency]
+            self._save_array(currency, values)
+
+        self._save_array("dates", new_dates)
+        temp_file = os.path.join(self.directory, "currencies.json.tmp")
+        with open(temp_file, "w") as f:
+            json.dump(currencies, f)
+        os.replace(temp_file, os.path.join(self.directory, "currencies.json"))
+        self._load()
+        return len(snapshots)
+
+    def add_snapshot(self, date, rates):
+        return self.import_snapshots([(date, rates)])
+
+    def date_indices(self, dates):
+        """Index of the snapshot in effect on each date (-1 before the first snapshot or for a missing date)."""
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        indices = np.searchsorted(self.dates, dates, side="right") - 1
+        # NaT sorts after every date, so it would otherwise pick the latest snapshot
+        return np.where(np.isnat(dates), -1, indices)
+
+    def _latest_valid(self, currency, column):
+        """For each snapshot, the index of the latest snapshot that has a rate for this currency."""
+        if currency not in self._latest:
+            positions = np.arange(len(column))
+            self._latest[currency] = np.maximum.accumulate(np.where(np.isnan(column), 0, positions))
+        return self._latest[currency]
+
+    def base_rates(self, currency, indices):
+        """Base-currency rates of one currency at the given snapshot indices (NaN if unknown)."""
+        column = self.column(currency)
+        if column is None or len(column) == 0:
+            return np.full(len(indices), np.nan)
+        # A snapshot missing this currency falls back to its previous known rate
+        rates = column[self._latest_valid(currency, column)[np.maximum(indices, 0)]]
+        return np.where(indices >= 0, rates, np.nan)
+
+    def get_rate(self, from_currency, to_currency, date):
+        """Rate from one currency to another as of a date, or None if unknown."""
+        index = self.date_indices([date])
+        rate = self.base_rates(to_currency, index)[0] / self.base_rates(from_currency, index)[0]
+        return None if np.isnan(rate) else float(rate)
+
+    def rates_on(self, dates, from_currencies, to_currency):
+        """Vectorized join: the rate into to_currency for each (date, from_currency) row."""
+        codes, groups = np.unique(np.asarray(from_currencies), return_inverse=True)
+        return self.grouped_rates(self.date_indices(dates), [str(code) for code in codes], groups, to_currency)
+
+    def grouped_rates(self, indices, codes, groups, to_currency):
+        """Like rates_on, with the currencies already factorized into codes[groups]."""
+        from_rates = np.full(len(indices), np.nan)
+        for position, code in enumerate(codes):
+            rows = groups == position
+            from_rates[rows] = self.base_rates(code, indices[rows])
+        return self.base_rates(to_currency, indices) / from_rates
 
 class CurrencyConverter:
-    def __init__(self):
-        self.api_url = "https://v6.exchangerate-api.com/v6/YOUR_API_KEY/latest/"  # Replace with your API key from ExchangeRate-API
+    def __init__(self, api_url="https://v6.exchangerate-api.com/v6/YOUR_API_KEY/latest/",
+                 base_currency="USD", cache_file=CACHE_FILE, cache_ttl=CACHE_TTL, history=None):
+        self.api_url = api_url  # Replace YOUR_API_KEY with your API key from ExchangeRate-API
+        self.base_currency = base_currency
+        self.cache_file = cache_file
+        self.cache_ttl = cache_ttl
         self.currencies = []  # List to hold supported currencies
+        self.rates = {}  # Units of each currency per 1 base currency
+        self.rates_fetched_at = 0.0
+        self.session = requests.Session()  # Keeps the HTTP connection alive between refreshes
+        self.history = history  # Optional RateHistoryStore that records each fetched table
 
-    def get_supported_currencies(self):
-        """Fetches the list of supported currencies from the API."""
-        response = requests.get(self.api_url)
-        if response.status_code == 200:
-            data = response.json()
-            if data['result'] == 'success':
-                self.currencies = list(data['conversion_rates'].keys())
+    def _rates_are_fresh(self):
+        return bool(self.rates) and time.time() - self.rates_fetched_at < self.cache_ttl
+
+    def _load_cached_rates(self):
+        """Loads the rate table from the disk cache, if it matches our base currency."""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file, "r") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cached.get("base") != self.base_currency or not cached.get("rates"):
+            return False
+        self.rates = cached["rates"]
+        self.rates_fetched_at = cached["fetched_at"]
+        return True
+
+    def _save_cached_rates(self):
+        if not self.cache_file:
+            return
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, "w") as f:
+            json.dump({"base": self.base_currency, "fetched_at": self.rates_fetched_at, "rates": self.rates}, f)
+        os.replace(temp_file, self.cache_file)
+
+    def refresh_rates(self, force=False):
+        """Makes sure a fresh base-currency rate table is available, fetching it only when the TTL expired."""
+        if not force:
+            if self._rates_are_fresh():
+                return True
+            if self._load_cached_rates() and self._rates_are_fresh():
                 return True
+
+        try:
+            response = self.session.get(f"{self.api_url}{self.base_currency}", timeout=REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                data = response.json()
+                if data['result'] == 'success':
+                    self.rates = data['conversion_rates']
+                    self.rates_fetched_at = time.time()
+                    self._save_cached_rates()
+                    if self.history is not None:
+                        self.history.add_snapshot(datetime.date.today(), self.rates)
+                    return True
+        except requests.RequestException as e:
+            print(f"Error fetching exchange rates: {e}")
+
+        if self.rates:
+            print("Using cached exchange rates; they may be out of date.")
+            return True
+        return False
+
+    def get_supported_currencies(self):
+        """Fetches the list of supported currencies from the rate table."""
+        if self.refresh_rates():
+            self.currencies = list(self.rates.keys())
+            return True
         return False
 
     def get_exchange_rate(self, from_currency, to_currency):
-        """Fetches the exchange rate between two currencies."""
-        response = requests.get(f"{self.api_url}{from_currency}")
-        if response.status_code == 200:
-            data = response.json()
-            if data['result'] == 'success':
-                conversion_rate = data['conversion_rates'].get(to_currency)
-                if conversion_rate:
-                    return conversion_rate
+        """Derives the exchange rate between two currencies by triangulating through the base currency."""
+        if not self.refresh_rates():
+            return None
+        from_rate = self.rates.get(from_currency)
+        to_rate = self.rates.get(to_currency)
+        if from_rate and to_rate:
+            return to_rate / from_rate
         return None
 
     def convert(self, from_currency, to_currency, amount):
@@ -34,6 +229,101 @@ class CurrencyConverter:
         else:
             return None
 
+    def convert_csv(self, input_path, output_path, to_currency, amount_column="amount",
+                    currency_column="currency", output_column="converted_amount", date_column=None):
+        """
+        Streams a CSV ledger in chunks and writes it back with a converted amount column.
+
+        The currency column is dictionary-encoded per chunk, so each distinct
+        (currency, to_currency) pair is looked up once and the whole chunk is
+        converted with a single vectorized multiply. With a date_column, rates
+        come from the local history store as of each row's date and the network
+        is never used. Rows in unknown currencies get an empty converted amount.
+        Returns the number of rows converted.
+        """
+        # Only bulk conversion needs pyarrow; single conversions work without it
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        column_types = {
+            amount_column: pa.float64(),
+            currency_column: pa.dictionary(pa.int32(), pa.string()),
+        }
+        if date_column:
+            if self.history is None:
+                print("Historical conversion needs a rate history store.")
+                return None
+            column_types[date_column] = pa.date32()
+        else:
+            if not self.refresh_rates():
+                print("Unable to fetch currency data.")
+                return None
+            to_rate = self.rates.get(to_currency)
+            if not to_rate:
+                print(f"Unsupported target currency: {to_currency}")
+                return None
+            pair_rates = {}  # from_currency -> rate into to_currency
+
+        reader = pa_csv.open_csv(
+            input_path,
+            read_options=pa_csv.ReadOptions(block_size=BULK_BLOCK_SIZE, use_threads=False),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        )
+
+        rows = 0
+        writer = None
+        try:
+            for batch in reader:
+                currencies = batch.column(currency_column)
+                dictionary = currencies.dictionary.to_pylist()
+                codes = currencies.indices.to_numpy(zero_copy_only=False)
+                # Null currency cells point one past the dictionary, which never has a rate
+                codes = np.where(currencies.is_null().to_numpy(zero_copy_only=False), len(dictionary), codes)
+
+                if date_column:
+                    indices = self.history.date_indices(batch.column(date_column).to_numpy(zero_copy_only=False))
+                    rates = self.history.grouped_rates(indices, dictionary, codes, to_currency)
+                else:
+                    for code in dictionary:
+                        if code not in pair_rates:
+                            pair_rates[code] = to_rate / self.rates[code] if self.rates.get(code) else np.nan
+                    chunk_rates = np.array([pair_rates[code] for code in dictionary] + [np.nan])
+                    rates = chunk_rates[codes]
+
+                converted = np.round(batch.column(amount_column).to_numpy(zero_copy_only=False) * rates, 2)
+                output = pa.RecordBatch.from_arrays(
+                    batch.columns + [pa.array(converted, mask=np.isnan(converted))],
+                    names=batch.schema.names + [output_column],
+                )
+                if writer is None:
+                    writer = pa_csv.CSVWriter(output_path, output.schema)
+                writer.write_batch(output)
+                rows += batch.num_rows
+            if writer is None:
+                # Header-only input still gets an output file with the header row
+                schema = reader.schema.append(pa.field(output_column, pa.float64()))
+                writer = pa_csv.CSVWriter(output_path, schema)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    def run_bulk(self):
+        """Converts a CSV ledger file and reports the throughput."""
+        input_path = input("Enter the path of the CSV ledger: ")
+        output_path = input("Enter the path for the converted CSV: ")
+        to_currency = input("Enter the currency to convert into (e.g., USD, EUR): ").upper()
+        date_column = None
+        if self.history is not None:
+            date_column = input("Date column for historical rates (leave empty for latest rates): ").strip() or None
+
+        start = time.perf_counter()
+        rows = self.convert_csv(input_path, output_path, to_currency, date_column=date_column)
+        if rows is None:
+            return
+        elapsed = time.perf_counter() - start
+        print(f"Converted {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec).")
+
     def display_supported_currencies(self):
         """Displays the list of supported currencies."""
         print("Supported currencies:")
@@ -86,5 +376,9 @@ class CurrencyConverter:
 
 
 if __name__ == "__main__":
-    currency_converter = CurrencyConverter()
-    currency_converter.run()
+    currency_converter = CurrencyConverter(history=RateHistoryStore())
+    mode = input("Convert a single amount or a whole CSV ledger? (single/csv): ").strip().lower()
+    if mode == "csv":
+        currency_converter.run_bulk()
+    else:
+        currency_converter.run()
@@ -0,0 +1,285 @@
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import sqlite3
+import time
+import os
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.tif', '.webp'}
+HASH_SIZE = 8            # 8x8 bits -> 64-bit hashes
+PHASH_SIZE = 32          # pHash works on a 32x32 DCT
+INDEX_FILE = "image_hashes.db"
+WRITE_BATCH = 1000       # rows per executemany when updating the index
+
+# DCT-II basis for the pHash transform, built once per process
+_DCT_MATRIX = np.cos(
+    np.pi * (2 * np.arange(PHASH_SIZE)[None, :] + 1) * np.arange(PHASH_SIZE)[:, None] / (2 * PHASH_SIZE)
+)
+
+
+# Function to open an image decoded at reduced size
+def open_reduced(image_path, size):
+    """Open an image, letting the decoder downscale (JPEG DCT scaling) before we resize."""
+    image = Image.open(image_path)
+    # draft() only affects JPEG/PCD, but it is the main win: an 8x smaller decode
+    image.draft('L', (size * 4, size * 4))
+    return image.convert('L')
+
+
+# Function to compute the difference hash of an image
+def dhash(image):
+    """64-bit gradient hash: is each pixel brighter than its right neighbour?"""
+    pixels = np.asarray(image.resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return _bits_to_int(bits)
+
+
+# Function to compute the perceptual (DCT) hash of an image
+def phash(image):
+    """64-bit DCT hash: low-frequency coefficients compared with their median."""
+    pixels = np.asarray(image.resize((PHASH_SIZE, PHASH_SIZE), Image.BILINEAR), dtype=np.float64)
+    dct = _DCT_MATRIX @ pixels @ _DCT_MATRIX.T
+    low = dct[:HASH_SIZE, :HASH_SIZE].ravel()
+    # The DC term only carries overall brightness, keep it out of the median
+    bits = low > np.median(low[1:])
+    return _bits_to_int(bits)
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+# Function to count differing bits between two hashes
+def hamming_distance(hash_a, hash_b):
+    return (hash_a ^ hash_b).bit_count()
+
+
+# Function to hash one file (runs inside worker processes)
+def hash_image_file(image_path):
+    """Return (path, mtime, size, dhash, phash), or (path, None, None, None, error) on failure."""
+    try:
+        stat = os.stat(image_path)
+        image = open_reduced(image_path, PHASH_SIZE)
+        return image_path, stat.st_mtime, stat.st_size, dhash(image), phash(image)
+    except Exception as e:
+        return image_path, None, None, None, str(e)
+
+
+# Function to list all image files below a directory
+def find_image_files(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(root, name)
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for 'within k bits' queries."""
+
+    def __init__(self):
+        # Each node is [hash, items, children] with children keyed by distance
+        self.root = None
+        self.size = 0
+
+    def add(self, hash_value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [hash_value, [item], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, [item], {}]
+                return
+            node = child
+
+    def search(self, hash_value, max_distance):
+        """Return [(distance, item), ...] for every item within max_distance bits."""
+        results = []
+        if self.root is None:
+            return results
+
+        stack = [self.root]
+        while stack:
+            node_hash, items, children = stack.pop()
+            distance = hamming_distance(hash_value, node_hash)
+            if distance <= max_distance:
+                results.extend((distance, item) for item in items)
+            # Triangle inequality: only subtrees in [d - k, d + k] can hold matches
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return results
+
+
+class ImageHashIndex:
+    """Persisted dHash/pHash index of an image library, backed by SQLite."""
+
+    def __init__(self, index_file=INDEX_FILE):
+        self.conn = sqlite3.connect(index_file)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                dhash INTEGER NOT NULL,
+                phash INTEGER NOT NULL
+            )
+        ''')
+        self.conn.commit()
+        self._trees = {}
+
+    def update(self, directory, workers=None):
+        """Hash new or changed images below directory in parallel. Returns (hashed, failed)."""
+        known = {path: (mtime, size) for path, mtime, size in
+                 self.conn.execute('SELECT path, mtime, size FROM images')}
+
+        pending = []
+        for path in find_image_files(directory):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_mtime, stat.st_size):
+                pending.append(path)
+
+        hashed, failed, batch = 0, 0, []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, mtime, size, d_hash, p_hash in pool.map(hash_image_file, pending, chunksize=64):
+                if mtime is None:
+                    print(f"Error hashing {path}: {p_hash}")
+                    failed += 1
+                    continue
+                batch.append((path, mtime, size, _to_signed(d_hash), _to_signed(p_hash)))
+                if len(batch) >= WRITE_BATCH:
+                    hashed += self._write(batch)
+        hashed += self._write(batch)
+
+        self._trees.clear()
+        return hashed, failed
+
+    def _write(self, batch):
+        count = len(batch)
+        if batch:
+            self.conn.executemany('INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?)', batch)
+            self.conn.commit()
+            batch.clear()
+        return count
+
+    def prune(self):
+        """Remove index entries whose files no longer exist."""
+        missing = [(path,) for (path,) in self.conn.execute('SELECT path FROM images')
+                   if not os.path.exists(path)]
+        self.conn.executemany('DELETE FROM images WHERE path = ?', missing)
+        self.conn.commit()
+        self._trees.clear()
+        return len(missing)
+
+    def tree(self, hash_type='phash'):
+        """Build (once) the BK-tree for the given hash column."""
+        if hash_type not in ('dhash', 'phash'):
+            raise ValueError("hash_type must be 'dhash' or 'phash'")
+        if hash_type not in self._trees:
+            tree = BKTree()
+            for path, value in self.conn.execute(f'SELECT path, {hash_type} FROM images'):
+                tree.add(_to_unsigned(value), path)
+            self._trees[hash_type] = tree
+        return self._trees[hash_type]
+
+    def find_similar(self, image_path, max_distance=6, hash_type='phash'):
+        """Images in the index within max_distance bits of image_path, closest first."""
+        path, mtime, _, d_hash, p_hash = hash_image_file(image_path)
+        if mtime is None:
+            raise ValueError(f"Cannot hash {path}: {p_hash}")
+        query = p_hash if hash_type == 'phash' else d_hash
+        matches = self.tree(hash_type).search(query, max_distance)
+        return sorted((distance, match) for distance, match in matches
+                      if os.path.abspath(match) != os.path.abspath(image_path))
+
+    def find_duplicate_groups(self, max_distance=4, hash_type='phash'):
+        """Group near-duplicate images (connected within max_distance bits)."""
+        tree = self.tree(hash_type)
+        parent = {}
+
+        def find(item):
+            parent.setdefault(item, item)
+            root = item
+            while parent[root] != root:
+                root = parent[root]
+            while parent[item] != root:
+                parent[item], item = root, parent[item]
+            return root
+
+        for path, value in self.conn.execute(f'SELECT path, {hash_type} FROM images'):
+            for _, match in tree.search(_to_unsigned(value), max_distance):
+                if match != path:
+                    root_a, root_b = find(path), find(match)
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+
+        groups = {}
+        for path in parent:
+            groups.setdefault(find(path), set()).add(path)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+    def close(self):
+        self.conn.close()
+
+
+# SQLite integers are signed 64-bit, hashes are unsigned
+def _to_signed(value):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# Main function to index a library and report duplicates
+def main():
+    index = ImageHashIndex()
+
+    print("Select an option:")
+    print("1. Index a directory")
+    print("2. Find images similar to a file")
+    print("3. List near-duplicate groups")
+
+    choice = input("Enter your choice (1-3): ")
+
+    if choice == '1':
+        directory = input("Enter the directory to index: ")
+        start = time.perf_counter()
+        hashed, failed = index.update(directory)
+        removed = index.prune()
+        elapsed = time.perf_counter() - start
+        print(f"Hashed {hashed} images ({failed} failed, {removed} removed) in {elapsed:.1f}s")
+    elif choice == '2':
+        image_path = input("Enter the path to the image: ")
+        max_distance = int(input("Enter the maximum Hamming distance (e.g., 6): ") or 6)
+        for distance, match in index.find_similar(image_path, max_distance):
+            print(f"{distance:2d}  {match}")
+    elif choice == '3':
+        max_distance = int(input("Enter the maximum Hamming distance (e.g., 4): ") or 4)
+        groups = index.find_duplicate_groups(max_distance)
+        for number, group in enumerate(groups, 1):
+            print(f"\nGroup {number}:")
+            for path in group:
+                print(f"  {path}")
+        print(f"\nFound {len(groups)} groups of near-duplicate images")
+    else:
+        print("Invalid choice")
+
+    index.close()
+
+if __name__ == "__main__":
+    main()
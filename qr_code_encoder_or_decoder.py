@@ -1,20 +1,17 @@
-import qrcode
 import cv2
+from concurrent.futures import ProcessPoolExecutor
+from qr_batch_generator import make_qr_image, generate_qr_codes_from_csv
+import json
+import os
+import time
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+MAX_DETECT_SIDE = 1024  # longest side used for the first, downscaled detection pass
 
 # Function to create a QR code
 def create_qr_code(message):
-    # Generate QR Code
-    qr = qrcode.QRCode(
-        version=1,  # size of the QR code
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,  # size of each box in the QR code
-        border=4,  # thickness of the border
-    )
-    qr.add_data(message)
-    qr.make(fit=True)
-
-    # Create an image from the QR code
-    img = qr.make_image(fill='black', back_color='white')
+    # Generate QR Code (version 1, 10px boxes, 4-box border)
+    img = make_qr_image(message, box_size=10, border=4)
     img.show()  # This will display the generated QR code image
 
     # Save the QR code as a PNG file
@@ -22,26 +19,92 @@ def create_qr_code(message):
     print("QR Code has been generated and saved as 'generated_qr_code.png'.")
 
 # Function to decode a QR code from an image file
-def decode_qr_code():
-    # Read the image file
-    img = cv2.imread('generated_qr_code.png')  # Assume the generated QR code is saved as 'generated_qr_code.png'
+def decode_qr_code(image_path='generated_qr_code.png'):
+    # Read the image file (defaults to the QR code generated by option 1)
+    img = cv2.imread(image_path)
+    if img is None:
+        print(f"Could not read the image '{image_path}'.")
+        return
     detector = cv2.QRCodeDetector()
 
     # Detect and decode the QR code
-    value, pts, qr_code = detector(img)
+    value, pts, qr_code = detector.detectAndDecode(img)
     
     if value:
         print(f"Decoded message from QR Code: {value}")
     else:
         print("Failed to decode the QR code.")
 
+# Detect and decode every QR code in an image
+def _detect_codes(detector, img):
+    found, values, points, _ = detector.detectAndDecodeMulti(img)
+    if not found:
+        return [], []
+    decoded = [(value, corners) for value, corners in zip(values, points) if value]
+    return [value for value, _ in decoded], [corners for _, corners in decoded]
+
+# Function to decode all QR codes in one image (runs inside worker processes)
+def decode_image_codes(image_path):
+    """Detect on a downscaled copy first, retrying at full resolution if nothing decodes."""
+    start = time.perf_counter()
+    result = {"path": image_path, "codes": [], "points": [], "full_resolution_retry": False, "error": None}
+
+    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        result["error"] = "unreadable image"
+    else:
+        # A corrupt or oddly sized image must not abort a whole directory run
+        try:
+            detector = cv2.QRCodeDetector()
+            scale = MAX_DETECT_SIDE / max(img.shape[:2])
+            codes, points = [], []
+            if scale < 1:
+                small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                codes, points = _detect_codes(detector, small)
+                points = [corners / scale for corners in points]
+            if not codes:
+                result["full_resolution_retry"] = scale < 1
+                codes, points = _detect_codes(detector, img)
+            result["codes"] = codes
+            result["points"] = [corners.round(1).tolist() for corners in points]
+        except cv2.error as e:
+            result["error"] = f"decode failed: {e}"
+
+    result["decode_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+# Function to decode every image in a directory into a JSONL report
+def decode_qr_directory(directory, output_path="qr_decode_results.jsonl", workers=None):
+    start = time.perf_counter()
+    image_paths = [
+        os.path.join(root, name)
+        for root, _, files in os.walk(directory)
+        for name in files
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    ]
+
+    images, codes, failed = 0, 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(output_path, "w") as out:
+        for result in pool.map(decode_image_codes, image_paths, chunksize=16):
+            out.write(json.dumps(result) + "\n")
+            images += 1
+            codes += len(result["codes"])
+            failed += not result["codes"]
+
+    elapsed = time.perf_counter() - start
+    print(f"Decoded {codes} QR codes from {images} images ({failed} without a code) "
+          f"in {elapsed:.1f}s. Results written to '{output_path}'.")
+    return images, codes
+
 # Display the game menu to the user
 def display_menu():
     print("\n==== QR Code Encoder and Decoder Game ====")
     print("1. Generate QR Code from Message")
     print("2. Decode QR Code from Image")
-    print("3. Exit")
-    choice = input("Choose an option (1/2/3): ")
+    print("3. Generate QR Codes in Bulk from CSV")
+    print("4. Decode All QR Codes in a Directory")
+    print("5. Exit")
+    choice = input("Choose an option (1/2/3/4/5): ")
     return choice
 
 # Main game loop
@@ -56,6 +119,14 @@ def run_qr_game():
             print("Decoding QR Code from the file 'generated_qr_code.png'...")
             decode_qr_code()
         elif choice == '3':
+            csv_path = input("Enter the CSV file with the messages: ")
+            column = input("Enter the column holding the messages: ")
+            fmt = input("Output format (png/svg): ").lower() or 'png'
+            generate_qr_codes_from_csv(csv_path, "qr_codes", column, fmt=fmt)
+        elif choice == '4':
+            directory = input("Enter the directory with the images: ")
+            decode_qr_directory(directory)
+        elif choice == '5':
             print("Exiting the game. Goodbye!")
             break
         else:
@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from bank_management_system import Bank, SQLiteBank, VelocityRule
+
+
+class RollUpStatementsTest(unittest.TestCase):
+    def _check_roll_up(self, bank_class):
+        data_dir = tempfile.mkdtemp(prefix="bank_test_")
+        self.addCleanup(shutil.rmtree, data_dir, ignore_errors=True)
+        bank = bank_class(data_dir)
+        self.addCleanup(bank.close)
+        account = bank.create_account("alice", "savings", 0.0)
+        account.deposit(100.0)
+        account.withdraw(30.0)
+        bank.commit()
+        month = datetime.now().strftime("%Y-%m")
+
+        bank.roll_up_statements(datetime.now() + timedelta(days=120))
+
+        statements = {s.month: s for s in bank.get_statements(account.account_number)}
+        self.assertIn(month, statements)
+        self.assertEqual(statements[month].total_deposits, 100.0)
+        self.assertEqual(statements[month].total_withdrawals, 30.0)
+        self.assertEqual(statements[month].closing_balance, 70.0)
+        self.assertEqual(bank.get_account(account.account_number).balance, 70.0)
+
+    def test_json_backend(self):
+        self._check_roll_up(Bank)
+
+    def test_sqlite_backend(self):
+        self._check_roll_up(SQLiteBank)
+
+
+class VelocityRuleTest(unittest.TestCase):
+    def test_rejects_non_positive_limits(self):
+        for limits in ({"window": 0, "max_count": 3}, {"window": -60, "max_amount": 100.0},
+                       {"max_count": 0}, {"max_amount": -1.0}):
+            with self.subTest(**limits):
+                with self.assertRaises(ValueError):
+                    VelocityRule("bad", **limits)
+
+
+if __name__ == "__main__":
+    unittest.main()